@@ -0,0 +1,275 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from swing.builder import ChartBuilder
+from swing.core import SwingCore
+from swing.helpers import get_archive_filename
+from swing.parsers import Requirement
+from swing.tracing import tracer
+from swing.yaml_utils import dump_yaml, clear_file_cache
+
+RESULTS_VERSION = 1
+DEFAULT_SIZES = [1, 10, 100, 500]
+DEFAULT_REPEAT = 3
+REGRESSION_THRESHOLD = 1.1
+
+DEPLOYMENT_TEMPLATE = '''version: '3.8'
+
+services:
+  {{ Values.serviceName }}:
+    image: {{ Values.image.repository }}:{{ Values.image.tag }}
+    {% if Values.command %}command: {{ Values.command }}{% endif %}
+    environment:
+    {% for key, value in Values.environment.items() %}
+      {{ key }}: "{{ value }}"
+    {% endfor %}
+    ports:
+    {% for port in Values.ports %}
+      - "{{ port.published }}:{{ port.target }}"
+    {% endfor %}
+    volumes:
+      - {{ Values.serviceName }}-data:{{ Values.dataPath }}
+    networks:
+      - {{ Values.network }}
+    labels:
+    {% for key, value in Values.labels.items() %}
+      {{ key }}: "{{ value }}"
+    {% endfor %}
+    deploy:
+      mode: replicated
+      replicas: {{ Values.replicas }}
+      resources:
+        limits:
+          cpus: "{{ Values.resources.cpus }}"
+          memory: {{ Values.resources.memory }}
+      restart_policy:
+        condition: on-failure
+    {% if Values.healthcheck.enabled %}
+    healthcheck:
+      test: ["CMD", "curl", "-f", "http://localhost:{{ Values.ports[0].target }}/health"]
+      interval: {{ Values.healthcheck.interval }}
+      retries: {{ Values.healthcheck.retries }}
+    {% endif %}
+
+volumes:
+  {{ Values.serviceName }}-data: {}
+
+networks:
+  {{ Values.network }}:
+    driver: overlay
+'''
+
+
+def create_values(index):
+    return {
+        'serviceName': f'service-{index}',
+        'image': {'repository': f'registry.local/team/service-{index}', 'tag': f'1.{index % 10}.{index}'},
+        'command': f'serve --workers {index % 8 + 1}' if index % 2 else None,
+        'environment': {f'SERVICE_{index}_VAR_{i}': f'value-{i}' for i in range(15)},
+        'ports': [{'published': 10000 + index, 'target': 8080}],
+        'dataPath': '/var/lib/data',
+        'network': 'backend',
+        'labels': {'team': 'platform', 'tier': 'backend', 'chart': f'chart-{index}'},
+        'replicas': index % 3 + 1,
+        'resources': {'cpus': '0.5', 'memory': '256M'},
+        'healthcheck': {'enabled': index % 2 == 0, 'interval': '30s', 'retries': 3},
+    }
+
+
+def write_yaml(path, data):
+    with open(path, 'w') as f:
+        dump_yaml(data, f, default_flow_style=False, sort_keys=False)
+
+
+def generate_chart(charts_dir, index):
+    chart_dir = os.path.join(charts_dir, f'chart-{index}')
+    os.makedirs(chart_dir)
+
+    write_yaml(os.path.join(chart_dir, 'chart.yaml'), {
+        'name': f'chart-{index}',
+        'version': '1.0.0',
+        'description': f'Synthetic chart number {index}',
+    })
+    write_yaml(os.path.join(chart_dir, 'values.yaml'), create_values(index))
+    with open(os.path.join(chart_dir, 'deployment.yaml'), 'w') as f:
+        f.write(DEPLOYMENT_TEMPLATE)
+
+    return chart_dir
+
+
+def generate_stack(root, size):
+    sources_dir = os.path.join(root, 'sources')
+    stack_dir = os.path.join(root, 'stack')
+    install_dir = os.path.join(stack_dir, 'charts')
+    os.makedirs(sources_dir)
+    os.makedirs(install_dir)
+
+    chart_dirs = [generate_chart(sources_dir, i) for i in range(size)]
+
+    custom_values = {f'chart-{i}': {'replicas': 2, 'labels': {'env': 'production'}} for i in range(0, size, 3)}
+    write_yaml(os.path.join(stack_dir, 'values.yaml'), custom_values)
+
+    for i, chart_dir in enumerate(chart_dirs):
+        with SwingCore.zip_folder(chart_dir) as archive, \
+                open(os.path.join(install_dir, get_archive_filename(f'chart-{i}', '1.0.0')), 'wb') as f:
+            f.write(archive.read())
+
+    return chart_dirs, stack_dir
+
+
+def run_build_phases(stack_dir, jobs, bytecode_dir):
+    clear_file_cache()
+    tracer.reset()
+    tracer.enable()
+    try:
+        builder = ChartBuilder(stack_dir, jobs=jobs, force=True, bytecode_dir=bytecode_dir)
+        builder.build_chart(os.path.join(stack_dir, 'docker-stack.yaml'))
+        # with more jobs, the phases of the worker processes are summed up
+        return {phase.name: phase.total for phase in tracer.summarize()}
+    finally:
+        tracer.enabled = False
+        tracer.reset()
+
+
+def run_build_chart(stack_dir, force, jobs, bytecode_dir):
+    clear_file_cache()
+    builder = ChartBuilder(stack_dir, jobs=jobs, force=force, bytecode_dir=bytecode_dir)
+    start = time.perf_counter()
+    builder.build_chart(os.path.join(stack_dir, 'docker-stack.yaml'))
+    return time.perf_counter() - start
+
+
+def run_zip_folder(chart_dirs):
+    start = time.perf_counter()
+    for chart_dir in chart_dirs:
+        with SwingCore.zip_folder(chart_dir) as archive:
+            archive.read()
+    return time.perf_counter() - start
+
+
+def run_install(chart_dirs, root, jobs):
+    install_dir = tempfile.mkdtemp(dir=root)
+    requirements = [Requirement(os.path.basename(d), file=d) for d in chart_dirs]
+
+    start = time.perf_counter()
+    SwingCore(None).install_requirements(requirements, install_dir, jobs=jobs)
+    return time.perf_counter() - start
+
+
+def summarize(name, size, samples):
+    return {
+        'benchmark': name,
+        'charts': size,
+        'repeat': len(samples),
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'max': max(samples),
+    }
+
+
+def run_size(size, repeat, jobs):
+    samples = {}
+
+    def add(name, value):
+        samples.setdefault(name, []).append(value)
+
+    with tempfile.TemporaryDirectory(prefix='swing-bench-') as root:
+        chart_dirs, stack_dir = generate_stack(root, size)
+        bytecode_dir = os.path.join(root, 'templates')
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(repeat):
+                for phase, elapsed in run_build_phases(stack_dir, jobs, bytecode_dir).items():
+                    add(f'build.{phase}', elapsed)
+
+                add('build_chart.full', run_build_chart(stack_dir, True, jobs, bytecode_dir))
+                add('build_chart.incremental', run_build_chart(stack_dir, False, jobs, bytecode_dir))
+                add('zip_folder', run_zip_folder(chart_dirs))
+                add('install_requirements', run_install(chart_dirs, root, jobs))
+
+    return [summarize(name, size, values) for name, values in samples.items()]
+
+
+def get_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return result.stdout.decode('utf-8').strip() or None
+
+
+def compare_results(results, baseline_path, threshold):
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+
+    previous = {(r['benchmark'], r['charts']): r['median'] for r in baseline.get('results', [])}
+
+    regressions = 0
+    print(f'\n{"benchmark":<26} {"charts":>6} {"baseline":>10} {"current":>10} {"ratio":>7}')
+    for result in results:
+        key = (result['benchmark'], result['charts'])
+        if key not in previous:
+            continue
+
+        ratio = result['median'] / previous[key] if previous[key] else float('inf')
+        marker = ' !' if ratio > threshold else ''
+        regressions += ratio > threshold
+        print(f'{key[0]:<26} {key[1]:>6} {previous[key] * 1000:>8.1f}ms {result["median"] * 1000:>8.1f}ms '
+              f'{ratio:>6.2f}x{marker}')
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the build and install pipeline on synthetic stacks.')
+    parser.add_argument('-s', '--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help='Comma separated numbers of charts in the generated stacks.')
+    parser.add_argument('-n', '--repeat', type=int, default=DEFAULT_REPEAT, help='Number of runs of every benchmark.')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='Number of parallel builds and installs.')
+    parser.add_argument('-o', '--output', help='Path of the JSON results file.')
+    parser.add_argument('-c', '--compare', help='Path of a previous JSON results file to compare with.')
+    parser.add_argument('-t', '--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='Ratio of the medians reported as a regression.')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+
+    results = []
+    for size in sizes:
+        print(f'Running {size} charts stack', file=sys.stderr)
+        results.extend(run_size(size, args.repeat, args.jobs))
+
+    report = {
+        'version': RESULTS_VERSION,
+        'commit': get_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'results': results,
+    }
+
+    print(f'{"benchmark":<26} {"charts":>6} {"min":>10} {"median":>10}')
+    for result in results:
+        print(f'{result["benchmark"]:<26} {result["charts"]:>6} {result["min"] * 1000:>8.1f}ms '
+              f'{result["median"] * 1000:>8.1f}ms')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare and compare_results(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+import argparse
+import timeit
+
+import yaml
+
+from swing.yaml_utils import load_yaml, dump_yaml
+
+
+def create_document(services):
+    return {
+        'version': '3.7',
+        'services': {
+            f'service-{i}': {
+                'image': f'registry.local/service-{i}:1.0.{i}',
+                'environment': {f'VAR_{j}': str(j) for j in range(20)},
+                'ports': [f'{8000 + i}:80'],
+                'volumes': [f'data-{i}:/var/lib/data'],
+                'labels': {'team': 'core', 'tier': 'backend'},
+            } for i in range(services)
+        },
+        'volumes': {f'data-{i}': {} for i in range(services)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare libyaml and pure Python yaml loading and dumping.')
+    parser.add_argument('-s', '--services', type=int, default=200)
+    parser.add_argument('-n', '--number', type=int, default=5)
+    args = parser.parse_args()
+
+    document = create_document(args.services)
+    text = dump_yaml(document, default_flow_style=False, sort_keys=True)
+
+    cases = [
+        ('load (libyaml)', lambda: load_yaml(text)),
+        ('load (python)', lambda: load_yaml(text, loader=yaml.SafeLoader)),
+        ('dump (libyaml)', lambda: dump_yaml(document, default_flow_style=False, sort_keys=True)),
+        ('dump (python)', lambda: dump_yaml(document, dumper=yaml.SafeDumper, default_flow_style=False,
+                                            sort_keys=True)),
+    ]
+
+    print(f'libyaml available: {yaml.__with_libyaml__}, document size: {len(text)} bytes')
+    for name, func in cases:
+        elapsed = min(timeit.repeat(func, number=1, repeat=args.number))
+        print(f'{name:<16} {elapsed * 1000:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,30 @@
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+import uuid
 from base64 import b64encode
 
 import requests
+from requests.adapters import HTTPAdapter
 
+from .cache import CachedResponse
 from .errors import ApiHttpError
-from .helpers import get_archive_filename
+from .helpers import get_archive_filename, remove_file
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 60
+DEFAULT_RETRIES = 3
+DEFAULT_POOL_SIZE = 10
+RETRY_BACKOFF = 0.5
+RETRY_MAX_BACKOFF = 10
+RETRY_METHODS = ['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE']
+RETRY_STATUS_CODES = [429, 502, 503, 504]
 
 
 class User:
@@ -29,11 +50,13 @@ class Chart:
 
 
 class Release:
-    def __init__(self, version, release_date, archive_url, notes):
+    def __init__(self, version, release_date, archive_url, notes, digest=None, dependencies=None):
         self.version = version
         self.release_date = release_date
         self.archive_url = archive_url
         self.notes = notes
+        self.digest = digest
+        self.dependencies = dependencies
 
     @classmethod
     def from_dict(cls, json):
@@ -41,59 +64,347 @@ class Release:
         release_date = json.get('releaseDate')
         archive_url = json.get('archiveUrl')
         notes = json.get('notes')
-        return cls(version, release_date, archive_url, notes)
+        digest = json.get('digest')
+        dependencies = json.get('dependencies')
+        return cls(version, release_date, archive_url, notes, digest, dependencies)
+
+
+class MultipartBody:
+    def __init__(self, fields, files, chunk_size=UPLOAD_CHUNK_SIZE):
+        self.boundary = uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        self.parts = []
+        self.length = 0
+
+        for name, value in fields.items():
+            header = f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+            self.add_part(header.encode('utf-8') + str(value).encode('utf-8') + b'\r\n')
+
+        for name, (filename, file) in files.items():
+            header = f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n' \
+                     f'Content-Type: application/octet-stream\r\n\r\n'
+            self.add_part(header.encode('utf-8'))
+            self.add_part(file)
+            self.add_part(b'\r\n')
+
+        self.add_part(f'--{self.boundary}--\r\n'.encode('utf-8'))
+
+    @property
+    def content_type(self):
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def add_part(self, part):
+        if isinstance(part, (bytes, bytearray, memoryview)):
+            part = bytes(part)
+            self.length += len(part)
+            self.parts.append((part, None))
+        else:
+            start = part.tell()
+            part.seek(0, os.SEEK_END)
+            self.length += part.tell() - start
+            part.seek(start)
+            self.parts.append((part, start))
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        for part, start in self.parts:
+            if start is None:
+                yield part
+            else:
+                part.seek(start)
+                for chunk in iter(lambda: part.read(self.chunk_size), b''):
+                    yield chunk
+
+
+class RequestStats:
+    def __init__(self):
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def average_latency(self):
+        return self.total_latency / self.requests if self.requests else 0.0
+
+    def add_request(self, latency):
+        with self.lock:
+            self.requests += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def add_retry(self):
+        with self.lock:
+            self.retries += 1
+
+    def add_result(self, success):
+        with self.lock:
+            if success:
+                self.successes += 1
+            else:
+                self.failures += 1
 
 
 class ApiService:
-    def __init__(self, server_url, email, password, session=None):
+    def __init__(self, server_url, email, password, session=None, response_cache=None, session_store=None,
+                 timeout=None, retries=None, backoff=None, pool_size=None, page_size=None):
         self.server_url = server_url
         self.email = email
         self.password = password
-        self.session = session or requests.Session()
+        self.session = session or self.create_session(pool_size or DEFAULT_POOL_SIZE)
+        self.response_cache = response_cache
+        self.session_store = session_store
+        self.timeout = timeout or (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)
+        self.retries = DEFAULT_RETRIES if retries is None else retries
+        self.backoff = RETRY_BACKOFF if backoff is None else backoff
+        self.page_size = page_size
+        self.stats = RequestStats()
+        self.logged_in = False
+
+        if session_store:
+            self.load_cookies()
 
     @staticmethod
     def parse_error_response(response):
-        error = response.json()
-        return error.get('description'), error.get('code')
+        try:
+            error = response.json()
+        except ValueError:
+            return response.reason, response.status_code
+        return error.get('description'), error.get('code') or response.status_code
+
+    @staticmethod
+    def create_session(pool_size):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def resize_pool(self, pool_size):
+        # recording sessions mount their own adapters, which are kept
+        for prefix in ['http://', 'https://']:
+            adapter = self.session.adapters.get(prefix)
+            if isinstance(adapter, HTTPAdapter):
+                self.session.mount(prefix, HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                                                       max_retries=adapter.max_retries))
+                adapter.close()
+
+    def get_backoff(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(int(retry_after), RETRY_MAX_BACKOFF)
+
+        return random.uniform(0, min(RETRY_MAX_BACKOFF, self.backoff * 2 ** attempt))
 
     def request(self, path, method='GET', **kwargs):
-        response = None
-        try:
-            response = self.session.request(method, f'{self.server_url}{path}', **kwargs)
-            response.raise_for_status()
-            return response
-        except requests.ConnectionError:
-            raise ApiHttpError('Repository server is not available')
-        except requests.HTTPError:
-            message, code = self.parse_error_response(response)
-            raise ApiHttpError(message, code)
+        kwargs.setdefault('timeout', self.timeout)
+        retries = self.retries if method in RETRY_METHODS else 0
+
+        for attempt in range(retries + 1):
+            response = None
+            start = time.monotonic()
+            try:
+                response = self.session.request(method, f'{self.server_url}{path}', **kwargs)
+                if response.status_code in RETRY_STATUS_CODES and attempt < retries:
+                    error = None
+                else:
+                    response.raise_for_status()
+                    self.stats.add_result(True)
+                    return response
+            except requests.Timeout:
+                error = ApiHttpError('Repository server did not respond in time')
+            except requests.ConnectionError:
+                error = ApiHttpError('Repository server is not available')
+            except requests.HTTPError:
+                message, code = self.parse_error_response(response)
+                error = ApiHttpError(message, code)
+            finally:
+                self.stats.add_request(time.monotonic() - start)
+
+            if error and (attempt == retries or response is not None):
+                self.stats.add_result(False)
+                raise error
+
+            if response is not None:
+                response.close()
+
+            self.stats.add_retry()
+            time.sleep(self.get_backoff(attempt, response))
+
+    def load_cookies(self):
+        for c in self.session_store.load(self.server_url, self.email):
+            self.session.cookies.set(c.get('name'), c.get('value'), domain=c.get('domain'), path=c.get('path'),
+                                     secure=c.get('secure'), expires=c.get('expires'))
+            self.logged_in = True
+
+    def get_cookies(self):
+        return [dict(name=c.name, value=c.value, domain=c.domain, path=c.path, secure=c.secure, expires=c.expires)
+                for c in self.session.cookies]
+
+    def save_cookies(self):
+        self.session_store.save(self.server_url, self.email, self.get_cookies())
 
     def login(self):
         credentials = b64encode(bytes(f'{self.email}:{self.password}', encoding='utf-8')).decode('utf-8')
         response = self.request('/login', method='POST', headers={'Authorization': f'Basic {credentials}'})
+        self.logged_in = True
+
+        if self.session_store:
+            self.save_cookies()
+
         return User.from_dict(response.json())
-        
+
     def logout(self):
         self.request('/logout', method='POST')
+        self.logged_in = False
+        self.session.cookies.clear()
+
+        if self.session_store:
+            self.session_store.clear(self.server_url, self.email)
+
+    def authorized_request(self, path, method='GET', **kwargs):
+        if not self.logged_in:
+            self.login()
+
+        cookies = self.get_cookies()
+        try:
+            response = self.request(path, method=method, **kwargs)
+        except ApiHttpError as e:
+            if e.code != 401:
+                raise
+
+            self.login()
+            cookies = self.get_cookies()
+            response = self.request(path, method=method, **kwargs)
+
+        # servers may rotate the session cookie on any request
+        if self.session_store and self.get_cookies() != cookies:
+            self.save_cookies()
+
+        return response
 
-    def list_charts(self, query=None):
+    def request_json(self, path, params=None, refresh=False, revalidate=False):
+        if not self.response_cache:
+            return self.request(path, params=params).json()
+
+        key = self.response_cache.get_key(f'{self.server_url}{path}', params)
+        cached = self.response_cache.get(key)
+
+        headers = {}
+        if cached and not refresh:
+            if not revalidate and self.response_cache.is_fresh(cached):
+                return cached.body
+            if cached.etag:
+                headers['If-None-Match'] = cached.etag
+            if cached.last_modified:
+                headers['If-Modified-Since'] = cached.last_modified
+
+        response = self.request(path, params=params, headers=headers)
+        if response.status_code == 304 and cached:
+            self.response_cache.put(key, cached)
+            return cached.body
+
+        body = response.json()
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified or self.response_cache.ttl:
+            self.response_cache.put(key, CachedResponse(body, etag, last_modified))
+
+        return body
+
+    def evict_cached(self, path, params=None):
+        if not self.response_cache:
+            return
+
+        url = f'{self.server_url}{path}'
+        self.response_cache.delete(self.response_cache.get_key(url, params))
+
+        page = 1
+        while self.page_size and self.response_cache.delete(
+                self.response_cache.get_key(url, {**(params or {}), 'page': page, 'limit': self.page_size})):
+            page += 1
+
+    def evict_chart(self, chart_name, version=None):
+        self.evict_cached('/chart')
+        self.evict_cached('/release', {'chart': chart_name})
+        if version:
+            self.evict_cached('/release', {'chart': chart_name, 'version': version})
+        self.evict_cached('/index')
+
+    def list_pages(self, path, params, refresh=False, revalidate=False):
+        if not self.page_size:
+            yield self.request_json(path, params=params or None, refresh=refresh, revalidate=revalidate)
+            return
+
+        page = 1
+        while True:
+            items = self.request_json(path, params={**params, 'page': page, 'limit': self.page_size}, refresh=refresh,
+                                      revalidate=revalidate)
+            yield items
+
+            if len(items) < self.page_size:
+                return
+            page += 1
+
+    def list_items(self, path, params, model, refresh=False, revalidate=False):
+        pages = self.list_pages(path, params, refresh, revalidate)
+        first_page = next(pages)
+
+        def iterate():
+            yield from (model.from_dict(i) for i in first_page)
+            for page in pages:
+                yield from (model.from_dict(i) for i in page)
+
+        return iterate()
+
+    def list_charts(self, query=None, refresh=False):
+        params = dict()
         if query:
-            response = self.request('/chart', params={'query': query})
-        else:
-            response = self.request('/chart')
+            params['query'] = query
 
-        return [Chart.from_dict(c) for c in response.json()]
+        return self.list_items('/chart', params, Chart, refresh)
 
-    def list_releases(self, chart_name, version=None):
+    def list_releases(self, chart_name, version=None, refresh=False, revalidate=False):
         params = {
             'chart': chart_name
         }
         if version:
             params['version'] = version
 
-        response = self.request('/release', params=params)
+        return self.list_items('/release', params, Release, refresh, revalidate)
+
+    def get_index(self, refresh=False, revalidate=False):
+        from .index import RepositoryIndex
+
+        try:
+            return RepositoryIndex.from_dict(self.request_json('/index', refresh=refresh, revalidate=revalidate))
+        except ApiHttpError as e:
+            if e.code == 404:
+                # servers without the index are remembered, so the listings do not ask for it every time
+                if self.response_cache and self.response_cache.ttl:
+                    key = self.response_cache.get_key(f'{self.server_url}/index')
+                    self.response_cache.put(key, CachedResponse(None))
+                return None
+
+            cached = self.response_cache.get(self.response_cache.get_key(f'{self.server_url}/index')) \
+                if self.response_cache else None
+            if not cached:
+                raise
+            return RepositoryIndex.from_dict(cached.body, stale=True)
 
-        return [Release.from_dict(r) for r in response.json()]
+    def find_release(self, chart_name, version, refresh=True, revalidate=False):
+        try:
+            releases = self.list_releases(chart_name, version, refresh=refresh, revalidate=revalidate)
+            return next((r for r in releases if str(r.version) == str(version)), None)
+        except ApiHttpError as e:
+            if e.code != 404:
+                raise
+            return None
 
     def download_release(self, chart_name, version):
         filename = get_archive_filename(chart_name, version)
@@ -101,27 +412,101 @@ class ApiService:
 
         return response.content
 
-    def upload_release(self, archive_file, chart_name, version, notes=None):
-        self.login()
+    @staticmethod
+    def get_range_start(response):
+        match = re.match(r'^bytes (\d+)-', response.headers.get('Content-Range') or '')
+        return int(match.group(1)) if match else None
 
+    @staticmethod
+    def get_validator(response):
+        etag = response.headers.get('ETag')
+        if etag and not etag.startswith('W/'):
+            return etag
+        return response.headers.get('Last-Modified')
+
+    @staticmethod
+    def read_validator(validator_path):
+        try:
+            with open(validator_path, 'r') as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def save_release(self, chart_name, version, path, chunk_size=DOWNLOAD_CHUNK_SIZE):
+        filename = get_archive_filename(chart_name, version)
+        part_path = f'{path}.part'
+        validator_path = f'{part_path}.validator'
+        digest = hashlib.sha256()
+
+        offset = os.path.getsize(part_path) if os.path.isfile(part_path) else 0
+        validator = self.read_validator(validator_path) if offset else None
+        headers = {}
+        if offset and validator:
+            headers['Range'] = f'bytes={offset}-'
+            headers['If-Range'] = validator
+
+        try:
+            response = self.request(f'/release/{filename}', headers=headers, stream=True)
+        except ApiHttpError:
+            if not headers:
+                raise
+            remove_file(part_path)
+            remove_file(validator_path)
+            return self.save_release(chart_name, version, path, chunk_size)
+
+        with response:
+            if response.status_code == 206 and headers:
+                # the partial content is only appended when it continues the same archive at the same offset
+                if self.get_range_start(response) != offset:
+                    response.close()
+                    remove_file(part_path)
+                    remove_file(validator_path)
+                    return self.save_release(chart_name, version, path, chunk_size)
+
+                with open(part_path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(chunk_size), b''):
+                        digest.update(chunk)
+                mode = 'ab'
+            else:
+                mode = 'wb'
+                validator = self.get_validator(response)
+                if validator:
+                    with open(validator_path, 'w') as f:
+                        f.write(validator)
+                else:
+                    remove_file(validator_path)
+
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size):
+                    f.write(chunk)
+                    digest.update(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+
+        os.replace(part_path, path)
+        remove_file(validator_path)
+        return digest.hexdigest()
+
+    def upload_release(self, archive_file, chart_name, version, notes=None):
         filename = get_archive_filename(chart_name, version)
         files = dict(
-            chart=(filename, archive_file),
-            notes=notes
+            chart=(filename, archive_file)
         )
 
-        data = dict()
+        fields = dict()
         if notes:
-            data['notes'] = notes
+            fields['notes'] = notes
 
-        response = self.request('/release', method='POST', files=files, data=data)
+        body = MultipartBody(fields, files)
+        response = self.authorized_request('/release', method='POST', data=body,
+                                           headers={'Content-Type': body.content_type})
+        self.evict_chart(chart_name, version)
         return Release.from_dict(response.json())
 
     def delete_chart(self, chart_name, version=None):
-        self.login()
-
         params = dict()
         if version:
             params['version'] = version
 
-        self.request(f'/chart/{chart_name}', method='DELETE', params=params)
+        self.authorized_request(f'/chart/{chart_name}', method='DELETE', params=params)
+        self.evict_chart(chart_name, version)
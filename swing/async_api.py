@@ -0,0 +1,47 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_CONCURRENCY = 10
+
+
+class AsyncApiService:
+    def __init__(self, api, concurrency=DEFAULT_CONCURRENCY):
+        self.api = api
+        self.concurrency = concurrency
+        self.api.resize_pool(concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def login(self):
+        return await self.run(self.api.login)
+
+    async def list_charts(self, query=None, refresh=False):
+        return await self.run(lambda: list(self.api.list_charts(query, refresh=refresh)))
+
+    async def list_releases(self, chart_name, version=None, refresh=False):
+        return await self.run(lambda: list(self.api.list_releases(chart_name, version, refresh=refresh)))
+
+    async def download_release(self, chart_name, version):
+        return await self.run(self.api.download_release, chart_name, version)
+
+    async def save_release(self, chart_name, version, path):
+        return await self.run(self.api.save_release, chart_name, version, path)
+
+    async def upload_release(self, archive_file, chart_name, version, notes=None):
+        return await self.run(self.api.upload_release, archive_file, chart_name, version, notes)
+
+    async def delete_chart(self, chart_name, version=None):
+        return await self.run(self.api.delete_chart, chart_name, version)
@@ -1,104 +1,376 @@
 import fnmatch
+import hashlib
+import json
 import os
 import subprocess
 import zipfile
+from concurrent.futures import ProcessPoolExecutor
 
-import yaml
-from jinja2 import Environment, FileSystemLoader, exceptions
+from jinja2 import Environment, BaseLoader, FileSystemBytecodeCache, exceptions
 
-from .helpers import select_yaml, merge, create_directory, remove_directory, is_readable_dir
-from .parsers import parse_chart_definition
+from .compose import merge_composes, dump_compose
+from .helpers import select_yaml, select_zip_yaml, merge, is_readable_dir, is_tool, file_digest, create_directory
+from .parsers import read_chart_definition
+from .tracing import tracer, span, run_traced
 from .views import print_process, print_info
-from .errors import SwingCoreError
+from .yaml_utils import load_yaml, load_yaml_file, YAMLError
+from .errors import SwingCoreError, InvalidChartDefinitionError
+
+MANIFEST_VERSION = 1
+
+
+class ZipLoader(BaseLoader):
+    def __init__(self, zip_archive, digest=None):
+        self.zip_archive = zip_archive
+        self.digest = digest
+
+    def get_source(self, environment, template):
+        try:
+            source = self.zip_archive.read(template).decode('utf-8')
+        except KeyError:
+            raise exceptions.TemplateNotFound(template)
+
+        filename = f'{self.digest}/{template}' if self.digest else None
+        return source, filename, lambda: True
+
+    def list_templates(self):
+        return sorted(self.zip_archive.namelist())
+
+
+class CountingBytecodeCache(FileSystemBytecodeCache):
+    def __init__(self, directory):
+        create_directory(directory)
+        super().__init__(directory)
+        self.hits = 0
+        self.misses = 0
+
+    def load_bytecode(self, bucket):
+        super().load_bytecode(bucket)
+        if bucket.code is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            # the chart cache prunes the least recently used templates first
+            try:
+                os.utime(os.path.join(self.directory, self._get_cache_filename(bucket)))
+            except OSError:
+                pass
+
+
+environments = {}
+
+
+def get_environment(bytecode_dir=None):
+    if bytecode_dir not in environments:
+        bytecode_cache = CountingBytecodeCache(bytecode_dir) if bytecode_dir else None
+        environments[bytecode_dir] = Environment(bytecode_cache=bytecode_cache)
+    return environments[bytecode_dir]
+
+
+def get_cache_counts(env):
+    if not env.bytecode_cache:
+        return 0, 0
+    return env.bytecode_cache.hits, env.bytecode_cache.misses
+
+
+class BuildTarget:
+    def __init__(self, output_path, values, environment=None):
+        self.output_path = output_path
+        self.values = values
+        self.environment = environment
+        self.manifest_path = None
+        self.manifest = {}
+        self.entries = {}
+        self.composes = {}
 
 
 class ChartBuilder:
-    def __init__(self, chart_dir):
+    def __init__(self, chart_dir, validate=False, jobs=1, force=False, bytecode_dir=None, values_files=None,
+                 set_values=None):
         self.chart_dir = chart_dir
         self.install_dir = os.path.join(chart_dir, 'charts')
-        self.build_dir = os.path.join(chart_dir, 'build')
+        self.validate = validate
+        self.jobs = jobs
+        self.force = force
+        self.bytecode_dir = bytecode_dir
+        self.values_files = values_files or []
+        self.set_values = set_values or []
+        self.cache_hits = 0
+        self.cache_misses = 0
 
     @staticmethod
     def read_values(values_dir):
         values_file = select_yaml(values_dir, 'values')
-        with open(os.path.join(values_dir, values_file), 'r') as f:
-            values_dict = yaml.safe_load(f)
+        if not values_file:
+            return {}
+
+        return load_yaml_file(os.path.join(values_dir, values_file)) or {}
+
+    @staticmethod
+    def read_zip_values(zip_archive):
+        values_file = select_zip_yaml(zip_archive, 'values')
+        if not values_file:
+            return {}
 
-        return values_dict
+        with zip_archive.open(values_file, 'r') as f:
+            values_dict = load_yaml(f)
 
-    def build_requirement(self, requirement_dir, custom_values):
-        deployment_file = select_yaml(requirement_dir, 'deployment')
-        
-        requirement_values = self.read_values(requirement_dir)
-        values = merge(requirement_values, custom_values)
+        return values_dict or {}
 
-        file_loader = FileSystemLoader(requirement_dir)
-        env = Environment(loader=file_loader)
-        template = env.get_template(deployment_file)
+    def render_requirement(self, zip_archive, custom_values_list, digest=None):
+        deployment_file = select_zip_yaml(zip_archive, 'deployment')
+        if not deployment_file:
+            raise InvalidChartDefinitionError('No deployment file')
 
-        return template.render(Values=values)
+        with span('read values'):
+            requirement_values = self.read_zip_values(zip_archive)
+
+        with span('compile'):
+            env = get_environment(self.bytecode_dir).overlay(loader=ZipLoader(zip_archive, digest))
+            template = env.get_template(deployment_file)
+
+        composes = []
+        for custom_values in custom_values_list:
+            with span('read values'):
+                values = merge(requirement_values, custom_values)
+
+            with span('render'):
+                composes.append(template.render(Values=values))
+
+        return composes
+
+    def build_requirement(self, zip_archive, custom_values, digest=None):
+        return self.render_requirement(zip_archive, [custom_values], digest)[0]
 
     def list_requirement_archives(self):
         files = []
         for file in os.listdir(self.install_dir):
             if fnmatch.fnmatch(file, '*.zip'):
                 files.append(file)
-        return files
+        return sorted(files)
+
+    @staticmethod
+    def get_requirement_name(file):
+        return '.'.join(file.split('.')[:-1])
+
+    def build_archive(self, file, custom_values_list, digest=None):
+        requirement_name = self.get_requirement_name(file)
+        hits, misses = get_cache_counts(get_environment(self.bytecode_dir))
+
+        try:
+            with span('requirement', requirement=requirement_name):
+                with span('extract'):
+                    zip_archive = zipfile.ZipFile(os.path.join(self.install_dir, file), 'r')
+
+                with zip_archive:
+                    with span('parse definition'):
+                        definition_file = select_zip_yaml(zip_archive, 'chart')
+                        if not definition_file:
+                            raise InvalidChartDefinitionError('No definition file')
+
+                        with zip_archive.open(definition_file, 'r') as f:
+                            definition = read_chart_definition(f)
+
+                    composes = self.render_requirement(
+                        zip_archive, [values.get(definition.name) or {} for values in custom_values_list], digest)
+
+                with span('parse compose'):
+                    composes = [(compose, load_yaml(compose)) for compose in composes]
+
+            total_hits, total_misses = get_cache_counts(get_environment(self.bytecode_dir))
+            counts = total_hits - hits, total_misses - misses
+            return definition.name, composes, counts
+        except zipfile.BadZipFile:
+            raise SwingCoreError(f'Building of requirement \'{requirement_name}\' failed: invalid archive.')
+        except InvalidChartDefinitionError as e:
+            raise SwingCoreError(f'Building of requirement \'{requirement_name}\' failed: {e.message}')
+        except exceptions.TemplateError as e:
+            raise SwingCoreError(f'Building of requirement \'{requirement_name}\' failed: {e.message}.')
+        except YAMLError:
+            raise SwingCoreError(f'Building of requirement \'{requirement_name}\' failed: '
+                                 f'the rendered deployment is not a valid yaml file.')
+
+    def build_archives(self, files, custom_values, digests, jobs):
+        if jobs == 1:
+            return [self.build_archive(file, custom_values[file], digests[file]) for file in files]
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(run_traced, tracer.enabled, self.build_archive, file, custom_values[file],
+                                       digests[file]) for file in files]
+
+            results = []
+            for file, future in zip(files, futures):
+                try:
+                    result, spans = future.result()
+                    tracer.add(spans)
+                    results.append(result)
+                except Exception as e:
+                    for f in futures:
+                        f.cancel()
+
+                    if isinstance(e, SwingCoreError):
+                        raise
+                    raise SwingCoreError(f'Building of requirement \'{self.get_requirement_name(file)}\' failed: {e}')
+
+            return results
+
+    @staticmethod
+    def get_manifest_path(output_path):
+        output_dir, output_name = os.path.split(os.path.abspath(output_path))
+        return os.path.join(output_dir, f'.{output_name}.manifest.json')
 
     @staticmethod
-    def merge_composes(composes):
-        args = []
-        for c in composes:
-            args.append('-f')
-            args.append(c)
-        commands = ['docker-compose', *args, 'config']
-        result = subprocess.run(commands, stdout=subprocess.PIPE)
-        return result.stdout.decode('utf-8')
+    def read_manifest(manifest_path):
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+            return {}
+
+        return manifest.get('requirements') or {}
+
+    @staticmethod
+    def write_manifest(manifest_path, requirements):
+        temp_path = f'{manifest_path}.part'
+        with open(temp_path, 'w') as f:
+            json.dump({'version': MANIFEST_VERSION, 'requirements': requirements}, f, indent=2, sort_keys=True)
+        os.replace(temp_path, manifest_path)
+
+    @staticmethod
+    def get_values_digest(values):
+        values_json = json.dumps(values, sort_keys=True, default=str)
+        return hashlib.sha256(values_json.encode('utf-8')).hexdigest()
+
+    def find_cached_compose(self, entry, archive_digest, custom_values):
+        if not entry or entry.get('archive') != archive_digest:
+            return None
+
+        values_digest = self.get_values_digest(custom_values.get(entry.get('name')) or {})
+        if entry.get('values') != values_digest:
+            return None
+
+        try:
+            return load_yaml(entry.get('compose'))
+        except YAMLError:
+            return None
+
+    @staticmethod
+    def validate_compose(compose_path):
+        commands = ['docker-compose', '-f', compose_path, 'config', '-q']
+        result = subprocess.run(commands, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            message = result.stderr.decode('utf-8').strip()
+            raise SwingCoreError(f'Validation of the final docker-compose file failed: {message}')
+
+    def read_custom_values(self, environment=None):
+        with span('read values'):
+            values = self.read_values(self.chart_dir)
+
+            layers = []
+            if environment:
+                values_file = select_yaml(self.chart_dir, f'values.{environment}')
+                if not values_file:
+                    raise SwingCoreError(f'There is no values file for the \'{environment}\' environment.')
+                layers.append(load_yaml_file(os.path.join(self.chart_dir, values_file)))
+            layers += [load_yaml_file(path) for path in self.values_files]
+
+            for layer in layers + self.set_values:
+                if layer is None:
+                    continue
+                if not isinstance(layer, dict):
+                    raise SwingCoreError('The custom values have to be a mapping.')
+                values = merge(values, layer)
+
+            return values
+
+    @staticmethod
+    def get_environment_output_path(output_path, environment):
+        root, ext = os.path.splitext(output_path)
+        return f'{root}.{environment}{ext}'
 
     def build_chart(self, output_path):
+        self.build_targets([BuildTarget(output_path, self.read_custom_values())])
+
+    def build_environments(self, environments, output_path):
+        targets = [BuildTarget(self.get_environment_output_path(output_path, e), self.read_custom_values(e), e)
+                   for e in environments]
+        self.build_targets(targets)
+
+    def build_targets(self, targets):
         if not is_readable_dir(self.install_dir):
             raise SwingCoreError('There are no installed requirements to build from.')
-        
-        create_directory(self.build_dir)
-        
-        try:
-            files = self.list_requirement_archives()
-            custom_values = self.read_values(self.chart_dir)
-    
-            composes = []
-            for file in files:
-                requirement_name = '.'.join(file.split('.')[:-1])
-                requirement_dir = os.path.join(self.install_dir, requirement_name)
-    
-                print_process(f'Building \'{requirement_name}\' requirement')
-    
-                with zipfile.ZipFile(os.path.join(self.install_dir, file), 'r') as zip_archive:
-                    zip_archive.extractall(requirement_dir)
-    
-                filename = select_yaml(requirement_dir, 'chart')
-                definition_path = os.path.join(requirement_dir, filename)
-                definition = parse_chart_definition(definition_path)
-                
-                try:
-                    compose = self.build_requirement(requirement_dir, custom_values[definition.name])
-                    compose_path = os.path.join(self.build_dir, f'{definition.name}-compose.yaml')
-    
-                    with open(compose_path, 'w') as f:
-                        f.write(compose)
-    
-                    composes.append(compose_path)
-                except exceptions.TemplateError as e:
-                    raise SwingCoreError(f'Building of requirement \'{requirement_name}\' failed: {e.message}.')
-                finally:
-                    remove_directory(requirement_dir)
-    
+
+        if self.validate and not is_tool('docker-compose'):
+            raise SwingCoreError('To validate the chart, the docker-compose command has to be installed.')
+
+        files = self.list_requirement_archives()
+
+        for target in targets:
+            target.manifest_path = self.get_manifest_path(target.output_path)
+            target.manifest = {} if self.force else self.read_manifest(target.manifest_path)
+
+        digests = {}
+        pending = {}
+        for file in files:
+            with span('digest', requirement=self.get_requirement_name(file)):
+                archive_digest = file_digest(os.path.join(self.install_dir, file))
+            digests[file] = archive_digest
+
+            for target in targets:
+                compose = self.find_cached_compose(target.manifest.get(file), archive_digest, target.values)
+                if compose is not None:
+                    target.entries[file] = target.manifest[file]
+                    target.composes[file] = compose
+                else:
+                    target.entries[file] = {'archive': archive_digest}
+                    pending.setdefault(file, []).append(target)
+
+            if file in pending:
+                print_process(f'Building \'{self.get_requirement_name(file)}\' requirement')
+            else:
+                print_process(f'Reusing \'{self.get_requirement_name(file)}\' requirement')
+
+        pending_files = [file for file in files if file in pending]
+        custom_values = {file: [target.values for target in pending[file]] for file in pending_files}
+
+        results = self.build_archives(pending_files, custom_values, digests, self.jobs)
+        for file, (name, composes, (hits, misses)) in zip(pending_files, results):
+            self.cache_hits += hits
+            self.cache_misses += misses
+
+            for target, (compose_text, compose) in zip(pending[file], composes):
+                target.entries[file].update({
+                    'name': name,
+                    'values': self.get_values_digest(target.values.get(name) or {}),
+                    'compose': compose_text,
+                })
+                target.composes[file] = compose
+
+        if self.bytecode_dir and pending_files:
+            print_process(f'Template cache: {self.cache_hits} hits, {self.cache_misses} misses')
+
+        for target in targets:
+            self.write_target(target, files)
+
+    def write_target(self, target, files):
+        if target.environment:
+            print_process(f'Building final docker-compose file for the \'{target.environment}\' environment')
+        else:
             print_process('Building final docker-compose file')
-            docker_compose = self.merge_composes(composes)
-            
-            with open(output_path, 'w') as file:
-                file.write(docker_compose)
-            
-        finally:
-            print_process('Cleaning temporary files and directories')
-            remove_directory(self.build_dir)
 
+        with span('merge'):
+            merged = merge_composes(target.composes[file] for file in files)
+
+        with span('write'):
+            with open(target.output_path, 'w') as file:
+                file.write(dump_compose(merged))
+
+            self.write_manifest(target.manifest_path, target.entries)
+
+        if self.validate:
+            print_process('Validating final docker-compose file')
+            with span('validate'):
+                self.validate_compose(target.output_path)
@@ -0,0 +1,279 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+from .helpers import create_directory, file_digest, remove_file, get_cache_dir
+
+DEFAULT_CACHE_SIZE = 1024 ** 3
+DEFAULT_RESPONSE_TTL = 300
+
+
+class CacheStats:
+    def __init__(self, path, entries, size, max_size, templates=0):
+        self.path = path
+        self.entries = entries
+        self.templates = templates
+        self.size = size
+        self.max_size = max_size
+
+
+class ChartCache:
+    def __init__(self, cache_dir=None, max_size=None):
+        self.cache_dir = cache_dir or get_cache_dir()
+        self.max_size = max_size or DEFAULT_CACHE_SIZE
+        self.blobs_dir = os.path.join(self.cache_dir, 'blobs')
+        self.refs_dir = os.path.join(self.cache_dir, 'refs')
+        self.templates_dir = os.path.join(self.cache_dir, 'templates')
+        self.lock = threading.Lock()
+
+    def get_blob_path(self, digest):
+        return os.path.join(self.blobs_dir, digest[:2], f'{digest}.zip')
+
+    def get_ref_path(self, chart_name, version):
+        return os.path.join(self.refs_dir, chart_name, str(version))
+
+    def get_digest(self, chart_name, version):
+        ref_path = self.get_ref_path(chart_name, version)
+        if not os.path.isfile(ref_path):
+            return None
+
+        with open(ref_path, 'r') as f:
+            return f.read().strip() or None
+
+    def lookup(self, chart_name, version, digest=None):
+        digest = digest or self.get_digest(chart_name, version)
+        if not digest:
+            return None
+
+        blob_path = self.get_blob_path(digest)
+        if not os.path.isfile(blob_path):
+            return None
+
+        os.utime(blob_path)
+        return blob_path
+
+    def fetch(self, chart_name, version, target_path, digest=None):
+        digest = digest or self.get_digest(chart_name, version)
+        blob_path = self.lookup(chart_name, version, digest)
+        if not blob_path:
+            return False
+
+        try:
+            # blobs are linked into the install directories, so a changed blob is dropped instead of spread further
+            if file_digest(blob_path) != digest:
+                remove_file(blob_path)
+                return False
+
+            link_file(blob_path, target_path)
+        except OSError:
+            return False
+
+        return True
+
+    def store(self, chart_name, version, source_path, digest=None):
+        digest = digest or file_digest(source_path)
+        blob_path = self.get_blob_path(digest)
+        ref_path = self.get_ref_path(chart_name, version)
+
+        try:
+            if not os.path.isfile(blob_path):
+                create_directory(os.path.dirname(blob_path))
+                link_file(source_path, blob_path)
+
+            create_directory(os.path.dirname(ref_path))
+            temp_path = f'{ref_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(temp_path, 'w') as f:
+                f.write(digest)
+            os.replace(temp_path, ref_path)
+        except OSError:
+            return digest
+
+        self.prune()
+        return digest
+
+    @staticmethod
+    def list_files(directory):
+        entries = []
+        if not os.path.isdir(directory):
+            return entries
+
+        for dirname, subdirs, files in os.walk(directory):
+            for file in files:
+                path = os.path.join(dirname, file)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        return entries
+
+    def list_blobs(self):
+        return self.list_files(self.blobs_dir)
+
+    def list_templates(self):
+        return self.list_files(self.templates_dir)
+
+    def prune(self, max_size=None):
+        if max_size is None:
+            max_size = self.max_size
+
+        with self.lock:
+            # the compiled templates count against the same limit as the archives
+            entries = sorted(self.list_blobs() + self.list_templates())
+            total_size = sum(size for _, size, _ in entries)
+
+            removed = 0
+            for _, size, path in entries:
+                if total_size <= max_size:
+                    break
+                remove_file(path)
+                total_size -= size
+                if path.startswith(self.blobs_dir + os.sep):
+                    removed += 1
+
+            self.prune_refs()
+            return removed
+
+    def prune_refs(self):
+        if not os.path.isdir(self.refs_dir):
+            return
+
+        for chart_name in os.listdir(self.refs_dir):
+            chart_dir = os.path.join(self.refs_dir, chart_name)
+            for version in os.listdir(chart_dir):
+                if version.endswith('.tmp'):
+                    continue
+                digest = self.get_digest(chart_name, version)
+                if not digest or not os.path.isfile(self.get_blob_path(digest)):
+                    remove_file(os.path.join(chart_dir, version))
+
+            try:
+                os.rmdir(chart_dir)
+            except OSError:
+                pass
+
+    def clear(self):
+        with self.lock:
+            removed = len(self.list_blobs())
+            # the responses and sessions share the cache directory and are kept
+            shutil.rmtree(self.blobs_dir, ignore_errors=True)
+            shutil.rmtree(self.refs_dir, ignore_errors=True)
+            shutil.rmtree(self.templates_dir, ignore_errors=True)
+            return removed
+
+    def stats(self):
+        blobs = self.list_blobs()
+        templates = self.list_templates()
+        size = sum(size for _, size, _ in blobs + templates)
+        return CacheStats(self.cache_dir, len(blobs), size, self.max_size, len(templates))
+
+
+class CachedResponse:
+    def __init__(self, body, etag=None, last_modified=None, fetched_at=0):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+    @classmethod
+    def from_dict(cls, json):
+        return cls(json.get('body'), json.get('etag'), json.get('lastModified'), json.get('fetchedAt', 0))
+
+    def to_dict(self):
+        return {
+            'body': self.body,
+            'etag': self.etag,
+            'lastModified': self.last_modified,
+            'fetchedAt': self.fetched_at,
+        }
+
+
+class ResponseCache:
+    def __init__(self, cache_dir=None, ttl=None):
+        self.cache_dir = cache_dir or os.path.join(get_cache_dir(), 'responses')
+        self.ttl = DEFAULT_RESPONSE_TTL if ttl is None else ttl
+
+    @staticmethod
+    def get_key(url, params=None):
+        params = sorted((params or {}).items())
+        return hashlib.sha256(json.dumps([url, params]).encode('utf-8')).hexdigest()
+
+    def get_path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def get(self, key):
+        try:
+            with open(self.get_path(key), 'r') as f:
+                return CachedResponse.from_dict(json.load(f))
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def is_fresh(self, response):
+        return time.time() - response.fetched_at < self.ttl
+
+    def put(self, key, response):
+        response.fetched_at = time.time()
+        path = self.get_path(key)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+        try:
+            create_directory(self.cache_dir)
+            with open(temp_path, 'w') as f:
+                json.dump(response.to_dict(), f)
+            os.replace(temp_path, path)
+        except OSError:
+            remove_file(temp_path)
+
+    def delete(self, key):
+        try:
+            os.remove(self.get_path(key))
+        except OSError:
+            return False
+        return True
+
+
+class SessionStore:
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or os.path.join(get_cache_dir(), 'sessions')
+
+    def get_path(self, server_url, email):
+        key = hashlib.sha256(f'{server_url}|{email}'.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def load(self, server_url, email):
+        try:
+            with open(self.get_path(server_url, email), 'r') as f:
+                cookies = json.load(f)
+        except (OSError, ValueError):
+            return []
+
+        return cookies if isinstance(cookies, list) else []
+
+    def save(self, server_url, email, cookies):
+        path = self.get_path(server_url, email)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+        try:
+            os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(cookies, f)
+            os.replace(temp_path, path)
+        except OSError:
+            remove_file(temp_path)
+
+    def clear(self, server_url, email):
+        remove_file(self.get_path(server_url, email))
+
+
+def link_file(source_path, target_path):
+    temp_path = f'{target_path}.{os.getpid()}.{threading.get_ident()}.{time.monotonic_ns()}.tmp'
+    try:
+        os.link(source_path, temp_path)
+    except OSError:
+        shutil.copyfile(source_path, temp_path)
+    os.replace(temp_path, target_path)
@@ -1,12 +1,15 @@
 import click
 import os
+from typing import TYPE_CHECKING
 
-from .api import ApiService
-from .core import SwingCore
 from .errors import InvalidChartDefinitionError, InvalidRequirementsError, InvalidConfigError, ApiHttpError, SwingCoreError
 from .parsers import parse_config, parse_requirements, Config
-from .views import print_error
-from .helpers import select_yaml, get_current_dir
+from .views import print_error, print_timings
+from .tracing import tracer
+from .helpers import select_yaml, get_current_dir, parse_size, get_lock_path, find_chart_dirs, parse_set_value
+
+if TYPE_CHECKING:
+    from .core import SwingCore
 
 
 def read_config(ctx, param, path):
@@ -17,15 +20,49 @@ def read_config(ctx, param, path):
         raise click.BadParameter(e.message)
 
 
-def read_requirements(ctx, param, path):
+def find_requirements(ctx, param, path):
+    if not path:
+        filename = select_yaml(get_current_dir(), 'requirements')
+        path = os.path.join(get_current_dir(), filename) if filename else None
+    return path
+
+
+def read_requirements(path):
     try:
-        if not path:
-            filename = select_yaml(get_current_dir(), 'requirements')
-            path = os.path.join(get_current_dir(), filename)
         requirements = parse_requirements(path)
         return requirements
     except InvalidRequirementsError as e:
-        raise click.BadParameter(e.message)
+        raise click.BadParameter(e.message, param_hint='\'-r\' / \'--requirements\'')
+
+
+def read_size(ctx, param, value):
+    if value is None:
+        return None
+
+    size = parse_size(value)
+    if size is None:
+        raise click.BadParameter(f'Invalid size \'{value}\'')
+    return size
+
+
+def read_set_values(ctx, param, expressions):
+    values = []
+    for expression in expressions:
+        value = parse_set_value(expression)
+        if value is None:
+            raise click.BadParameter(f'Invalid value \'{expression}\', use KEY=VALUE')
+        values.append(value)
+    return values
+
+
+def read_environments(ctx, param, value):
+    if not value:
+        return None
+
+    environments = [e.strip() for e in value.split(',')]
+    if not all(environments):
+        raise click.BadParameter(f'Invalid environments \'{value}\'')
+    return environments
 
 
 class CatchAllExceptions(click.Group):
@@ -36,57 +73,137 @@ class CatchAllExceptions(click.Group):
             print_error(e.message)
         except InvalidChartDefinitionError as e:
             print_error(e.message)
+        except InvalidRequirementsError as e:
+            print_error(e.message)
         except SwingCoreError as e:
             print_error(e.message)
 
 
+TIMINGS_REQUIREMENTS_LIMIT = 10
+
+
+def report_timings(ctx, timings, trace_path):
+    api_service = ctx.obj.get('API')
+    api_stats = api_service.stats if api_service else None
+
+    if timings:
+        print_timings(tracer.summarize(), tracer.summarize_requirements(TIMINGS_REQUIREMENTS_LIMIT), api_stats)
+
+    if trace_path:
+        metadata = {'command': ctx.invoked_subcommand}
+        if api_stats:
+            metadata['http'] = {
+                'requests': api_stats.requests,
+                'successes': api_stats.successes,
+                'failures': api_stats.failures,
+                'retries': api_stats.retries,
+                'total_latency': api_stats.total_latency,
+                'max_latency': api_stats.max_latency,
+            }
+        tracer.write_trace(trace_path, metadata)
+
+
 @click.group(cls=CatchAllExceptions)
 @click.option('-c', '--config', metavar='FILENAME', help='Swing configuration file.', callback=read_config,
               required=False, type=click.Path(exists=True))
+@click.option('--timings', help='Print the time spent in every phase of the command.', is_flag=True)
+@click.option('--trace', 'trace_path', metavar='FILENAME', help='Write the phase spans to a Chrome trace file.',
+              required=False, type=click.Path(dir_okay=False, writable=True))
 @click.pass_context
-def swing(ctx, config: Config):
+def swing(ctx, config: Config, timings, trace_path):
     """Client for communication with the Swing Server respository."""
     ctx.ensure_object(dict)
-    api_service = ApiService(config.server_url, config.email, config.password)
-    ctx.obj['SWING_CORE'] = SwingCore(api_service)
+    ctx.obj['CONFIG'] = config
+
+    if timings or trace_path:
+        tracer.enable()
+        ctx.call_on_close(lambda: report_timings(ctx, timings, trace_path))
+
+
+def get_core(ctx, with_api=True):
+    from .cache import ChartCache
+    from .core import SwingCore
+
+    config: Config = ctx.obj['CONFIG']
+    chart_cache = ChartCache(config.cache_dir, config.cache_size)
+    api_service = create_api(config, chart_cache.cache_dir) if with_api else None
+    ctx.obj['API'] = api_service
+    return SwingCore(api_service, chart_cache, config.compression, config.compression_level)
+
+
+def create_api(config, cache_dir):
+    from .api import ApiService, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+    from .cache import ResponseCache, SessionStore
+
+    response_cache = ResponseCache(os.path.join(cache_dir, 'responses'), config.cache_ttl)
+    session_store = SessionStore(os.path.join(cache_dir, 'sessions'))
+    timeout = (config.connect_timeout or DEFAULT_CONNECT_TIMEOUT, config.read_timeout or DEFAULT_READ_TIMEOUT)
+    return ApiService(config.server_url, config.email, config.password, response_cache=response_cache,
+                      session_store=session_store, timeout=timeout, retries=config.retries,
+                      pool_size=config.pool_size, page_size=config.page_size)
 
 
 @swing.command()
 @click.argument('query', metavar='KEYWORD', required=False)
+@click.option('--refresh', help='Fetch the charts ignoring the response cache.', is_flag=True)
+@click.option('-l', '--limit', metavar='N', help='Maximal number of listed charts.', type=click.IntRange(min=1))
 @click.pass_context
-def search(ctx, query):
+def search(ctx, query, refresh, limit):
     """Search for available charts."""
-    core: SwingCore = ctx.obj['SWING_CORE']
-    core.list_charts(query)
+    core: SwingCore = get_core(ctx)
+    core.list_charts(query, refresh, limit)
 
 
 @swing.command()
 @click.argument('chart_name', metavar='CHART', required=True)
+@click.option('--refresh', help='Fetch the releases ignoring the response cache.', is_flag=True)
+@click.option('-l', '--limit', metavar='N', help='Maximal number of listed releases.', type=click.IntRange(min=1))
 @click.pass_context
-def show(ctx, chart_name):
+def show(ctx, chart_name, refresh, limit):
     """Show releases of the specific chart."""
-    core: SwingCore = ctx.obj['SWING_CORE']
-    core.list_releases(chart_name)
+    core: SwingCore = get_core(ctx)
+    core.list_releases(chart_name, refresh, limit)
 
 
 @swing.command()
-@click.option('-r', '--requirements', metavar='FILENAME', help='Chart dependencies file.', callback=read_requirements,
+@click.option('-r', '--requirements', metavar='FILENAME', help='Chart dependencies file.', callback=find_requirements,
               required=False, type=click.Path(exists=True))
+@click.option('-j', '--jobs', metavar='N', help='Number of requirements installed concurrently.', default=1,
+              type=click.IntRange(min=1))
+@click.option('--frozen', help='Install the archives recorded in the lock file only.', is_flag=True)
 @click.pass_context
-def install(ctx, requirements):
+def install(ctx, requirements, jobs, frozen):
     """Install requirements specified in the dependency file."""
-    core: SwingCore = ctx.obj['SWING_CORE']
-    core.install_requirements(requirements)
+    core: SwingCore = get_core(ctx)
+    lock_path = get_lock_path(requirements) if requirements else None
+    core.install_requirements(read_requirements(requirements), jobs=jobs, lock_path=lock_path, frozen=frozen)
 
 
 @swing.command()
-@click.argument('chart_path', metavar='PATH', required=False, type=click.Path(exists=True))
+@click.argument('chart_paths', metavar='[PATH]...', nargs=-1, type=click.Path(exists=True))
 @click.option('-n', '--notes', metavar='MESSAGE', help='Some release notes.', required=False)
+@click.option('-a', '--all', 'publish_all', help='Publish all charts found in the paths.', is_flag=True)
+@click.option('-j', '--jobs', metavar='N', help='Number of charts uploaded concurrently.', default=1,
+              type=click.IntRange(min=1))
 @click.pass_context
-def publish(ctx, chart_path, notes):
-    """Upload the local chart to the remote respository."""
-    core: SwingCore = ctx.obj['SWING_CORE']
-    core.publish_release(chart_path, notes)
+def publish(ctx, chart_paths, notes, publish_all, jobs):
+    """Upload the local charts to the remote respository."""
+    if not publish_all and len(chart_paths) > 1:
+        invalid = [path for path in chart_paths if not select_yaml(path, 'chart')]
+        if invalid:
+            paths = ', '.join(f'\'{path}\'' for path in invalid)
+            raise click.BadParameter(f'No chart definition in {paths}, use --all to search the directories',
+                                     param_hint='PATH')
+
+    core: SwingCore = get_core(ctx)
+
+    if publish_all:
+        chart_dirs = [d for path in chart_paths or [get_current_dir()] for d in find_chart_dirs(path)]
+        core.publish_releases(chart_dirs, notes, jobs)
+    elif len(chart_paths) > 1:
+        core.publish_releases(list(chart_paths), notes, jobs)
+    else:
+        core.publish_release(chart_paths[0] if chart_paths else None, notes)
 
 
 @swing.command()
@@ -95,18 +212,52 @@ def publish(ctx, chart_path, notes):
 @click.pass_context
 def delete(ctx, chart_name, version):
     """Delete the chart or specific release from the repository server."""
-    core: SwingCore = ctx.obj['SWING_CORE']
+    core: SwingCore = get_core(ctx)
     core.delete_chart(chart_name, version)
 
 
 @swing.command()
 @click.argument('chart_path', metavar='PATH', required=False, type=click.Path(exists=True))
 @click.option('-o', '--output', metavar='PATH', help='Docker compose output path.', required=False)
+@click.option('--validate', help='Validate the output using the docker-compose command.', is_flag=True)
+@click.option('-j', '--jobs', metavar='N', help='Number of requirements rendered in parallel.', default=1,
+              type=click.IntRange(min=1))
+@click.option('--force', help='Rebuild all requirements ignoring the build manifest.', is_flag=True)
+@click.option('-f', '--values', 'values_files', metavar='FILENAME', help='Values file merged over the chart values.',
+              multiple=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--set', 'set_values', metavar='KEY=VALUE', help='Value merged over the values files.', multiple=True,
+              callback=read_set_values)
+@click.option('--env', 'environments', metavar='ENV[,ENV...]', help='Environments built using their values files.',
+              callback=read_environments)
 @click.pass_context
-def build(ctx, chart_path, output):
+def build(ctx, chart_path, output, validate, jobs, force, values_files, set_values, environments):
     """Build the installed charts to the final docker compose file."""
-    core: SwingCore = ctx.obj['SWING_CORE']
-    core.build_chart(chart_path, output)
+    core: SwingCore = get_core(ctx, with_api=False)
+    core.build_chart(chart_path, output, validate, jobs, force, list(values_files), set_values, environments)
+
+
+@swing.group()
+def cache():
+    """Manage the local cache of downloaded charts."""
+
+
+@cache.command()
+@click.pass_context
+def stats(ctx):
+    """Show the size and location of the chart cache."""
+    core: SwingCore = get_core(ctx, with_api=False)
+    core.show_cache()
+
+
+@cache.command()
+@click.option('-s', '--max-size', metavar='SIZE', help='Size the cache is pruned to (e.g. 500M).', callback=read_size,
+              required=False)
+@click.option('-a', '--all', 'prune_all', help='Remove all cached archives and templates.', is_flag=True)
+@click.pass_context
+def prune(ctx, max_size, prune_all):
+    """Remove the least recently used archives from the chart cache."""
+    core: SwingCore = get_core(ctx, with_api=False)
+    core.prune_cache(max_size, prune_all)
 
 
 def main():
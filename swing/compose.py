@@ -0,0 +1,191 @@
+import copy
+
+from .errors import SwingCoreError
+from .helpers import merge
+from .yaml_utils import dump_yaml
+
+MAPPING_FIELDS = ['environment', 'labels', 'ulimits', 'sysctls', 'extra_hosts', 'storage_opt']
+DEEP_MAPPING_FIELDS = ['deploy', 'healthcheck', 'build', 'blkio_config']
+UNIQUE_LIST_FIELDS = ['cap_add', 'cap_drop', 'expose', 'external_links', 'volumes_from', 'device_cgroup_rules',
+                      'dns', 'dns_search', 'env_file', 'tmpfs', 'ports']
+NAMED_LIST_FIELDS = ['links', 'secrets', 'configs', 'security_opt']
+PATH_MAPPING_FIELDS = ['volumes', 'devices']
+TOP_LEVEL_SECTIONS = ['volumes', 'networks', 'secrets', 'configs']
+
+
+def parse_version(version):
+    try:
+        return tuple(int(p) for p in str(version).split('.'))
+    except ValueError:
+        raise SwingCoreError(f'Invalid compose file version \'{version}\'.')
+
+
+def normalize_mapping(value, separator='='):
+    if value is None:
+        return {}
+
+    if isinstance(value, dict):
+        return {k: v if v is None or isinstance(v, (dict, list)) else str(v) for k, v in value.items()}
+
+    mapping = {}
+    for item in value:
+        key, sep, item_value = str(item).partition(separator)
+        mapping[key] = item_value if sep else None
+    return mapping
+
+
+def normalize_list(value):
+    if value is None:
+        return []
+
+    if isinstance(value, (list, tuple)):
+        return list(value)
+
+    return [value]
+
+
+def normalize_networks(value):
+    if isinstance(value, list):
+        return {n: None for n in value}
+
+    return value or {}
+
+
+def get_item_name(item):
+    if isinstance(item, dict):
+        return item.get('source') or item.get('target')
+    return str(item).split(':')[0]
+
+
+def get_mount_path(item):
+    if isinstance(item, dict):
+        return item.get('target')
+
+    parts = str(item).split(':')
+    if len(parts) == 1:
+        return parts[0]
+    return parts[1]
+
+
+def merge_unique(base, override):
+    result = list(base)
+    for item in override:
+        if item not in result:
+            result.append(item)
+    return result
+
+
+def merge_by_key(base, override, key):
+    items = {key(i): i for i in base}
+    items.update({key(i): i for i in override})
+    return list(items.values())
+
+
+def normalize_depends_on(value):
+    if isinstance(value, dict):
+        return value
+    return {name: {'condition': 'service_started'} for name in normalize_list(value)}
+
+
+def merge_depends_on(base, override):
+    if isinstance(base, list) and isinstance(override, list):
+        return merge_unique(base, override)
+    return {**normalize_depends_on(base), **normalize_depends_on(override)}
+
+
+def merge_logging(base, override):
+    # the options of one logging driver do not apply to another one
+    if override.get('driver') and override.get('driver') != base.get('driver'):
+        return copy.deepcopy(override)
+    return merge(base, override)
+
+
+def normalize_service(service):
+    service = copy.deepcopy(service or {})
+
+    for field in MAPPING_FIELDS:
+        if field in service:
+            service[field] = normalize_mapping(service[field], ':' if field == 'extra_hosts' else '=')
+
+    for field in UNIQUE_LIST_FIELDS + NAMED_LIST_FIELDS + PATH_MAPPING_FIELDS:
+        if field in service:
+            service[field] = normalize_list(service[field])
+
+    if isinstance(service.get('build'), str):
+        service['build'] = {'context': service['build']}
+
+    if 'networks' in service:
+        service['networks'] = normalize_networks(service['networks'])
+
+    return service
+
+
+def merge_services(base, override):
+    result = copy.deepcopy(base)
+
+    for field, value in override.items():
+        if field not in result:
+            result[field] = copy.deepcopy(value)
+        elif field in MAPPING_FIELDS or field == 'networks':
+            result[field] = {**result[field], **value}
+        elif field == 'depends_on':
+            result[field] = merge_depends_on(result[field], value)
+        elif field == 'logging':
+            result[field] = merge_logging(result[field], value)
+        elif field in DEEP_MAPPING_FIELDS:
+            result[field] = merge(result[field], value)
+        elif field in UNIQUE_LIST_FIELDS:
+            result[field] = merge_unique(result[field], value)
+        elif field in NAMED_LIST_FIELDS:
+            result[field] = merge_by_key(result[field], value, get_item_name)
+        elif field in PATH_MAPPING_FIELDS:
+            result[field] = merge_by_key(result[field], value, get_mount_path)
+        else:
+            result[field] = copy.deepcopy(value)
+
+    return result
+
+
+def merge_composes(composes):
+    merged = {}
+    versions = []
+
+    for compose in composes:
+        if not compose:
+            continue
+
+        if not isinstance(compose, dict):
+            raise SwingCoreError('Compose file has to be a mapping.')
+
+        if 'version' in compose:
+            versions.append(str(compose['version']))
+
+        services = merged.setdefault('services', {})
+        for name, service in (compose.get('services') or {}).items():
+            service = normalize_service(service)
+            if name in services:
+                services[name] = merge_services(services[name], service)
+            else:
+                services[name] = service
+
+        for section in TOP_LEVEL_SECTIONS:
+            definitions = compose.get(section)
+            if not definitions:
+                continue
+
+            merged_section = merged.setdefault(section, {})
+            for name, definition in definitions.items():
+                merged_section[name] = merge(merged_section.get(name) or {}, definition or {})
+
+        for key, value in compose.items():
+            if key.startswith('x-'):
+                merged[key] = copy.deepcopy(value)
+
+    if versions:
+        merged['version'] = max(versions, key=parse_version)
+
+    return merged
+
+
+def dump_compose(compose):
+    return dump_yaml(compose, default_flow_style=False, sort_keys=True)
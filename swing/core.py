@@ -1,91 +1,328 @@
 import os
-import zipfile
-from io import BytesIO
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from itertools import islice
+from tempfile import SpooledTemporaryFile
 
-from .builder import ChartBuilder
-from .helpers import get_current_dir, create_directory, get_archive_filename, is_tool, select_yaml
-from .parsers import parse_chart_definition
-from .views import print_charts, print_releases, print_ok, print_process, print_info
+from .helpers import get_current_dir, create_directory, get_archive_filename, select_yaml, remove_file, file_digest, \
+    is_readable_file
+from .parsers import parse_chart_definition, parse_lock, Requirement
+from .tracing import span
+from .views import print_charts, print_releases, print_ok, print_process, print_info, print_cache_stats, \
+    print_error, print_warning, print_publish_summary
 from .errors import SwingCoreError
 
 
+ARCHIVE_SPOOL_SIZE = 8 * 1024 * 1024
+
+PUBLISHED = 'published'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+
+
 class SwingCore:
-    def __init__(self, api):
+    def __init__(self, api, cache=None, compression=None, compression_level=None):
         self.api = api
+        self.cache = cache
+        self.compression = compression
+        self.compression_level = compression_level
 
-    def list_charts(self, query):
-        charts = self.api.list_charts(query)
-        print_charts(charts, query)
+    def load_index(self, refresh=False, revalidate=False):
+        index = self.api.get_index(refresh=refresh, revalidate=revalidate)
+        if index and index.stale:
+            print_warning('The repository is not available, using the cached repository index.')
+        return index
+
+    def list_charts(self, query, refresh=False, limit=None):
+        index = self.load_index(refresh)
+        if index:
+            charts = index.search(query)
+        else:
+            charts = self.api.list_charts(query, refresh=refresh)
+        print_charts(islice(charts, limit), query)
 
-    def list_releases(self, chart_name):
-        charts = self.api.list_releases(chart_name)
-        print_releases(charts, chart_name)
+    def list_releases(self, chart_name, refresh=False, limit=None):
+        index = self.load_index(refresh)
+        if index:
+            releases = index.get_releases(chart_name) or []
+        else:
+            releases = self.api.list_releases(chart_name, refresh=refresh)
+        print_releases(islice(releases, limit), chart_name)
     
     @staticmethod
-    def zip_folder(dir_path):
-        archive = BytesIO()
-        with zipfile.ZipFile(archive, 'w') as zip_archive:
-            relroot = os.path.abspath(os.path.join(dir_path))
-            for dirname, subdirs, files in os.walk(dir_path):
-                for file in files:
-                    filename = os.path.join(dirname, file)
-                    arcname = os.path.join(os.path.relpath(dirname, relroot), file)
-                    zip_archive.write(filename, arcname=arcname)
+    def zip_folder(dir_path, compression=None, compression_level=None):
+        from .packaging import write_archive
+
+        archive = SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_SIZE)
+        write_archive(dir_path, archive, compression, compression_level)
+        archive.seek(0)
         return archive
 
-    def download_requirement(self, requirement, install_dir):
+    @staticmethod
+    def verify_archive(chart_path, locked):
+        if not is_readable_file(chart_path) or os.path.getsize(chart_path) != locked.size:
+            return False
+        return file_digest(chart_path) == locked.digest
+
+    def download_requirement(self, requirement, install_dir, locked=None):
         chart_name = requirement.chart_name
         version = requirement.version
 
+        chart_path = os.path.join(install_dir, get_archive_filename(chart_name, version))
+
+        if locked:
+            if self.verify_archive(chart_path, locked):
+                print_process(f'Verified \'{chart_name}-{version}\'')
+                return None
+
+            if self.cache and self.cache.fetch(chart_name, version, chart_path, locked.digest) \
+                    and self.verify_archive(chart_path, locked):
+                print_process(f'Using cached \'{chart_name}-{version}\'')
+                return chart_path
+
+        elif self.cache and self.cache.fetch(chart_name, version, chart_path):
+            print_process(f'Using cached \'{chart_name}-{version}\'')
+            return chart_path
+
         print_process(f'Downloading \'{chart_name}-{version}\'')
 
-        chart_path = os.path.join(install_dir, get_archive_filename(chart_name, version))
-        chart_archive = self.api.download_release(chart_name, version)
+        with span('download'):
+            digest = self.api.save_release(chart_name, version, chart_path)
+
+        if locked and digest != locked.digest:
+            remove_file(chart_path)
+            raise SwingCoreError(f'The archive of \'{chart_name}-{version}\' does not match the lock file.')
 
-        with open(chart_path, 'wb') as f:
-            f.write(chart_archive)
+        if self.cache:
+            self.cache.store(chart_name, version, chart_path, digest)
+
+        return chart_path
 
     def pack_requirement(self, requirement, install_dir):
         filename = select_yaml(requirement.file, 'chart')
         definition_path = os.path.join(requirement.file, filename)
-        definition = parse_chart_definition(definition_path)
+        with span('parse definition'):
+            definition = parse_chart_definition(definition_path)
+
         chart_path = os.path.join(install_dir, get_archive_filename(definition.name, definition.version))
 
         print_process(f'Packing \'{definition.name}-{definition.version}\' from \'{requirement.file}\'')
 
-        archive = self.zip_folder(requirement.file)
-        with open(chart_path, 'wb') as f:
-            f.write(archive.getbuffer())
+        part_path = f'{chart_path}.part'
+        with span('pack'):
+            try:
+                with self.zip_folder(requirement.file, self.compression, self.compression_level) as archive, \
+                        open(part_path, 'wb') as f:
+                    shutil.copyfileobj(archive, f)
+                os.replace(part_path, chart_path)
+            except BaseException:
+                remove_file(part_path)
+                raise
+
+        return chart_path
+
+    def install_requirement(self, requirement, install_dir, locked=None):
+        with span('requirement', requirement=requirement.chart_name):
+            if not requirement.file:
+                return self.download_requirement(requirement, install_dir, locked)
+            else:
+                return self.pack_requirement(requirement, install_dir)
+
+    @staticmethod
+    def verify_lock(requirements, lock):
+        for r in requirements:
+            if r.file:
+                continue
+
+            locked = lock.get(r.chart_name)
+            if not locked or locked.version != str(r.version):
+                raise SwingCoreError(f'Requirement \'{r.chart_name}\' is not locked, run install without --frozen.')
+
+    @staticmethod
+    def write_lock(requirements, install_dir, lock_path):
+        from .yaml_utils import dump_yaml
+
+        dependencies = []
+        for r in requirements:
+            if r.file:
+                continue
+
+            chart_path = os.path.join(install_dir, get_archive_filename(r.chart_name, r.version))
+            dependencies.append({
+                'name': r.chart_name,
+                'version': str(r.version),
+                'sha256': file_digest(chart_path),
+                'size': os.path.getsize(chart_path),
+            })
+
+        temp_path = f'{lock_path}.part'
+        with open(temp_path, 'w') as f:
+            dump_yaml({'dependencies': dependencies}, f, default_flow_style=False, sort_keys=False)
+        os.replace(temp_path, lock_path)
+
+    def install_requirements(self, requirements, install_dir=None, jobs=1, lock_path=None, frozen=False):
+        from .resolver import DependencyResolver
 
-    def install_requirements(self, requirements, install_dir=None):
         if not install_dir:
             install_dir = os.path.join(get_current_dir(), 'charts')
 
         if len(requirements) == 0:
             raise SwingCoreError('No requirements to install.')
 
+        lock = parse_lock(lock_path) if frozen else {}
+        index_loader = (lambda: self.load_index(revalidate=True)) if self.api and not frozen else None
+
+        with span('resolve'):
+            resolver = DependencyResolver(self.api, jobs, remote_dependencies=not frozen, lock=lock,
+                                          index_loader=index_loader)
+            requirements = resolver.resolve(requirements)
+
+        if frozen:
+            self.verify_lock(requirements, lock)
+            names = {r.chart_name for r in requirements}
+            requirements += [Requirement(l.chart_name, l.version) for l in lock.values() if l.chart_name not in names]
+
         print_info(f'Installing {len(requirements)} requirements')
         create_directory(install_dir)
+        existing = set(os.listdir(install_dir))
 
-        for r in requirements:
-            if not r.file:
-                self.download_requirement(r, install_dir)
+        installed = []
+        failed = None
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = {executor.submit(self.install_requirement, r, install_dir, lock.get(r.chart_name)): r
+                       for r in requirements}
+            done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+
+            for future in pending:
+                future.cancel()
+
+        for future, requirement in futures.items():
+            if future.cancelled():
+                continue
+
+            error = future.exception()
+            if error:
+                failed = failed or (requirement, error)
             else:
-                self.pack_requirement(r, install_dir)
-                
+                installed.append(future.result())
+
+        if failed:
+            # archives present before the command stay, so a failed install keeps the previous stack buildable
+            for path in installed:
+                if path and os.path.basename(path) not in existing:
+                    remove_file(path)
+
+            requirement, error = failed
+            message = getattr(error, 'message', str(error))
+            raise SwingCoreError(f'Installing of requirement \'{requirement.chart_name}\' failed: {message}')
+
+        if lock_path and not frozen:
+            self.write_lock(requirements, install_dir, lock_path)
+
         print_ok('All requirements are installed.')
 
-    def publish_release(self, chart_dir, notes):
+    def pack_release(self, chart_dir):
+        from .packaging import archive_digest
+
         if not chart_dir:
             chart_dir = get_current_dir()
-            
+
         filename = select_yaml(chart_dir, 'chart')
+        if not filename:
+            raise SwingCoreError(f'The directory \'{chart_dir}\' has no chart definition.')
+
         definition_path = os.path.join(chart_dir, filename)
-        definition = parse_chart_definition(definition_path)
-        archive = self.zip_folder(chart_dir)
+        with span('parse definition'):
+            definition = parse_chart_definition(definition_path)
+
+        with span('pack'):
+            archive = self.zip_folder(chart_dir, self.compression, self.compression_level)
+            digest = archive_digest(archive)
+            archive.seek(0)
+
+        return definition, archive, digest
+
+    def upload_archive(self, definition, archive, digest, notes):
+        with archive:
+            with span('check'):
+                published = self.api.find_release(definition.name, definition.version)
+
+            # releases published without a digest are left to the server to accept or reject
+            if published and published.digest:
+                release_name = f'{definition.name}-{definition.version}'
+                if published.digest == digest:
+                    print_ok(f'The release \'{release_name}\' is already published, skipping.')
+                    return SKIPPED
+                raise SwingCoreError(f'The release \'{release_name}\' is already published with a different '
+                                     f'content, increase the chart version.')
+
+            with span('upload'):
+                release = self.api.upload_release(archive, definition.name, definition.version, notes)
 
-        release = self.api.upload_release(archive.getbuffer(), definition.name, definition.version, notes)
         print_ok(f'The release is published at {release.archive_url}.')
+        return PUBLISHED
+
+    def publish_release(self, chart_dir, notes):
+        definition, archive, digest = self.pack_release(chart_dir)
+        return self.upload_archive(definition, archive, digest, notes)
+
+    def publish_chart(self, chart_dir, packed, notes):
+        try:
+            return self.upload_archive(*packed.result(), notes), None
+        except Exception as e:
+            message = getattr(e, 'message', str(e))
+            print_error(f'Publishing of \'{chart_dir}\' failed: {message}')
+            return FAILED, message
+
+    def publish_releases(self, chart_dirs, notes, jobs=1):
+        if len(chart_dirs) == 0:
+            raise SwingCoreError('No charts to publish.')
+
+        print_info(f'Publishing {len(chart_dirs)} charts')
+
+        if not self.api.logged_in:
+            self.api.login()
+
+        # the charts are packed on all cores, while at most `jobs` uploads run at a time; packing runs ahead of
+        # the uploads by a bounded window only, so the packed archives waiting for upload do not pile up in memory
+        pack_jobs = min(len(chart_dirs), os.cpu_count() or 1)
+        window = threading.Semaphore(jobs + pack_jobs)
+        uploads = []
+        with ThreadPoolExecutor(max_workers=pack_jobs) as pack_executor, \
+                ThreadPoolExecutor(max_workers=jobs) as upload_executor:
+            for chart_dir in chart_dirs:
+                window.acquire()
+                packed = pack_executor.submit(self.pack_release, chart_dir)
+                upload = upload_executor.submit(self.publish_chart, chart_dir, packed, notes)
+                upload.add_done_callback(lambda _: window.release())
+                uploads.append(upload)
+
+        results = [u.result() for u in uploads]
+
+        print_publish_summary([(d, status, message) for d, (status, message) in zip(chart_dirs, results)])
+
+        failed = sum(status == FAILED for status, _ in results)
+        if failed:
+            raise SwingCoreError(f'Publishing of {failed} of {len(chart_dirs)} charts failed.')
+
+    def show_cache(self):
+        if not self.cache:
+            raise SwingCoreError('The chart cache is not configured.')
+
+        print_cache_stats(self.cache.stats())
+
+    def prune_cache(self, max_size=None, prune_all=False):
+        if not self.cache:
+            raise SwingCoreError('The chart cache is not configured.')
+
+        if prune_all:
+            removed = self.cache.clear()
+        else:
+            removed = self.cache.prune(max_size)
+
+        print_ok(f'{removed} cached archives are removed.')
 
     def delete_chart(self, chart_name, version):
         self.api.delete_chart(chart_name, version)
@@ -94,9 +331,9 @@ class SwingCore:
         else:
             print_ok(f'The \'{chart_name}\' chart is deleted.')
 
-    def build_chart(self, chart_dir, output_path):
-        if not is_tool('docker-compose'):
-            raise SwingCoreError('To build the chart, the docker-compose command has to be installed.')
+    def build_chart(self, chart_dir, output_path, validate=False, jobs=1, force=False, values_files=None,
+                    set_values=None, environments=None):
+        from .builder import ChartBuilder
 
         if not chart_dir:
             chart_dir = get_current_dir()
@@ -106,7 +343,13 @@ class SwingCore:
 
         print_info(f'Building from \'{chart_dir}\'')
 
-        builder = ChartBuilder(chart_dir)
-        builder.build_chart(output_path)
-        
-        print_ok(f'The chart is built at \'{output_path}\'.')
+        bytecode_dir = self.cache.templates_dir if self.cache else None
+        builder = ChartBuilder(chart_dir, validate, jobs, force, bytecode_dir, values_files, set_values)
+
+        if environments:
+            builder.build_environments(environments, output_path)
+            output_paths = ', '.join(f'\'{builder.get_environment_output_path(output_path, e)}\'' for e in environments)
+            print_ok(f'The chart is built at {output_paths}.')
+        else:
+            builder.build_chart(output_path)
+            print_ok(f'The chart is built at \'{output_path}\'.')
@@ -25,5 +25,9 @@ class ApiHttpError(Exception):
 
 class SwingCoreError(Exception):
     def __init__(self, message):
+        self.reason = message
         self.message = f'Executing of the command failed: {message}'
         super().__init__(self.message)
+
+    def __reduce__(self):
+        return self.__class__, (self.reason,)
@@ -1,9 +1,13 @@
+import copy
+import hashlib
 import os
 import re
 import shutil
 from datetime import datetime
 
 url_regex = r'^http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*(),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+$'
+size_regex = r'^(\d+)\s*([kmgt]?)b?$'
+size_units = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
 
 
 def is_valid_url(url):
@@ -22,6 +26,11 @@ def get_current_dir():
     return os.getcwd()
 
 
+def get_cache_dir():
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'swing')
+
+
 def create_directory(path):
     if path and not os.path.exists(path):
         os.makedirs(path)
@@ -37,20 +46,42 @@ def remove_directory(path):
         shutil.rmtree(path)
 
 
-def merge(a, b, path=None):
-    if path is None:
-        path = []
-    for key in b:
-        if key in a:
-            if isinstance(a[key], dict) and isinstance(b[key], dict):
-                merge(a[key], b[key], path + [str(key)])
-            elif a[key] == b[key]:
-                pass
-            else:
-                a[key] = b[key]
+def merge(a, b):
+    merged = {}
+    for key, value in a.items():
+        if key not in b:
+            merged[key] = copy.deepcopy(value)
+        elif isinstance(value, dict) and isinstance(b[key], dict):
+            merged[key] = merge(value, b[key])
         else:
-            a[key] = b[key]
-    return a
+            merged[key] = copy.deepcopy(b[key])
+
+    for key, value in b.items():
+        if key not in a:
+            merged[key] = copy.deepcopy(value)
+
+    return merged
+
+
+def parse_set_value(expression):
+    key, sep, value = str(expression).partition('=')
+    keys = key.strip().split('.')
+    if not sep or not all(keys):
+        return None
+
+    from .yaml_utils import load_yaml, YAMLError
+
+    try:
+        parsed = load_yaml(value) if value.strip() else ''
+    except YAMLError:
+        parsed = value
+
+    if isinstance(parsed, (dict, list)):
+        parsed = value
+
+    for k in reversed(keys):
+        parsed = {k: parsed}
+    return parsed
 
 
 def select_yaml(directory, name):
@@ -65,7 +96,32 @@ def select_yaml(directory, name):
     return None
 
 
+def find_chart_dirs(root_dir):
+    chart_dirs = []
+    for dirname, subdirs, files in os.walk(root_dir):
+        if select_yaml(dirname, 'chart'):
+            chart_dirs.append(dirname)
+            subdirs[:] = []
+        else:
+            subdirs[:] = sorted(d for d in subdirs if not d.startswith('.') and d not in ('build', 'charts'))
+    return sorted(chart_dirs)
+
+
+def select_zip_yaml(zip_archive, name):
+    names = zip_archive.namelist()
+
+    if f'{name}.yaml' in names:
+        return f'{name}.yaml'
+    elif f'{name}.yml' in names:
+        return f'{name}.yml'
+
+    return None
+
+
 def format_date(date_string):
+    if not date_string:
+        return None
+
     fmt = '%a, %d %b %Y %H:%M:%S %Z'
     date = datetime.strptime(date_string, fmt)
     return date.strftime('%m/%d/%y')
@@ -78,3 +134,33 @@ def is_tool(name):
 def get_archive_filename(chart_name, version):
     return f'{chart_name}-{version}.zip'
 
+
+def get_lock_path(requirements_path):
+    return f'{os.path.splitext(requirements_path)[0]}.lock'
+
+
+def file_digest(path, chunk_size=65536):
+    with open(path, 'rb') as f:
+        return stream_digest(f, chunk_size)
+
+
+def stream_digest(stream, chunk_size=65536):
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_size(size_string):
+    match = re.match(size_regex, str(size_string).strip().lower())
+    if not match:
+        return None
+    return int(match.group(1)) * size_units[match.group(2)]
+
+
+def format_size(size):
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024:
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} TB'
@@ -0,0 +1,77 @@
+import difflib
+
+from .api import Chart, Release
+from .versions import get_version_key, select_version
+
+INDEX_VERSION = 1
+FUZZY_CUTOFF = 0.6
+
+
+class IndexEntry:
+    def __init__(self, chart, releases):
+        self.chart = chart
+        self.releases = releases
+
+    @classmethod
+    def from_dict(cls, name, json):
+        chart = Chart(name, json.get('description'))
+        releases = [Release.from_dict(r) for r in json.get('releases') or []]
+        return cls(chart, releases)
+
+
+class RepositoryIndex:
+    def __init__(self, entries, generated=None, stale=False):
+        self.entries = entries
+        self.generated = generated
+        self.stale = stale
+
+    @classmethod
+    def from_dict(cls, json, stale=False):
+        if not isinstance(json, dict) or json.get('apiVersion') != INDEX_VERSION:
+            return None
+
+        charts = json.get('charts') or {}
+        entries = {name: IndexEntry.from_dict(name, entry or {}) for name, entry in charts.items()}
+        return cls(entries, json.get('generated'), stale)
+
+    def get_score(self, entry, query):
+        name = entry.chart.name.lower()
+        description = (entry.chart.description or '').lower()
+
+        if name == query:
+            return 4.0
+        if name.startswith(query):
+            return 3.0
+        if query in name:
+            return 2.0
+        if query in description:
+            return 1.0
+
+        ratio = difflib.SequenceMatcher(None, query, name).ratio()
+        return ratio if ratio >= FUZZY_CUTOFF else 0.0
+
+    def search(self, query=None):
+        if not query:
+            return [self.entries[name].chart for name in sorted(self.entries)]
+
+        query = query.lower()
+        scored = [(self.get_score(entry, query), name) for name, entry in self.entries.items()]
+        return [self.entries[name].chart for score, name in sorted(scored, key=lambda s: (-s[0], s[1])) if score > 0]
+
+    def get_releases(self, chart_name):
+        entry = self.entries.get(chart_name)
+        if not entry:
+            return None
+        return sorted(entry.releases, key=lambda r: get_version_key(r.version) or (), reverse=True)
+
+    def find_release(self, chart_name, version):
+        entry = self.entries.get(chart_name)
+        if not entry:
+            return None
+        return next((r for r in entry.releases if str(r.version) == str(version)), None)
+
+    def resolve_version(self, chart_name, spec):
+        entry = self.entries.get(chart_name)
+        if not entry:
+            return None
+        return select_version([str(r.version) for r in entry.releases], spec)
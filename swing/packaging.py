@@ -0,0 +1,157 @@
+import fnmatch
+import hashlib
+import os
+import shutil
+import stat
+import zipfile
+
+IGNORE_FILENAME = '.swingignore'
+DEFAULT_EXCLUDES = ['.git/', '.hg/', '.svn/', '__pycache__/', '.DS_Store', '*.part', IGNORE_FILENAME,
+                    '/build/', '/charts/', '/docker-stack.yaml', '/.*.manifest.json']
+
+DEFAULT_COMPRESSION = 'deflate'
+COMPRESSION_METHODS = {
+    'stored': zipfile.ZIP_STORED,
+    'deflate': zipfile.ZIP_DEFLATED,
+    'bzip2': zipfile.ZIP_BZIP2,
+    'lzma': zipfile.ZIP_LZMA,
+}
+if hasattr(zipfile, 'ZIP_ZSTANDARD'):
+    COMPRESSION_METHODS['zstd'] = zipfile.ZIP_ZSTANDARD
+
+COMPRESSION_LEVELS = {
+    'deflate': (0, 9),
+    'bzip2': (1, 9),
+    'zstd': (1, 22),
+}
+
+ARCHIVE_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+FILE_MODE = 0o644
+EXECUTABLE_MODE = 0o755
+
+
+class IgnorePattern:
+    def __init__(self, pattern):
+        self.negated = pattern.startswith('!')
+        pattern = pattern[1:] if self.negated else pattern
+
+        self.dir_only = pattern.endswith('/')
+        pattern = pattern.rstrip('/')
+
+        self.anchored = '/' in pattern
+        self.pattern = pattern.lstrip('/')
+
+    def matches(self, path, is_dir):
+        if self.dir_only and not is_dir:
+            return False
+
+        if self.anchored:
+            return fnmatch.fnmatchcase(path, self.pattern)
+        return fnmatch.fnmatchcase(path.split('/')[-1], self.pattern)
+
+    def matches_below(self, dir_path):
+        if not self.anchored:
+            return True
+
+        parts = self.pattern.split('/')
+        dir_parts = dir_path.split('/')
+        return len(parts) > len(dir_parts) and all(fnmatch.fnmatchcase(d, p) for d, p in zip(dir_parts, parts))
+
+
+def read_ignore_patterns(dir_path):
+    patterns = list(DEFAULT_EXCLUDES)
+
+    ignore_path = os.path.join(dir_path, IGNORE_FILENAME)
+    if os.path.isfile(ignore_path):
+        with open(ignore_path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    patterns.append(line)
+
+    return [IgnorePattern(p) for p in patterns]
+
+
+def is_ignored(path, is_dir, patterns, ignored=False):
+    for pattern in patterns:
+        if pattern.matches(path, is_dir):
+            ignored = not pattern.negated
+    return ignored
+
+
+def is_included_below(dir_path, patterns):
+    return any(p.negated and p.matches_below(dir_path) for p in patterns)
+
+
+def list_files(dir_path, patterns=None):
+    if patterns is None:
+        patterns = read_ignore_patterns(dir_path)
+
+    files = []
+    ignored_dirs = set()
+    for dirname, subdirs, filenames in os.walk(dir_path):
+        reldir = os.path.relpath(dirname, dir_path).replace(os.sep, '/')
+        prefix = '' if reldir == '.' else f'{reldir}/'
+        parent_ignored = reldir in ignored_dirs
+
+        # an ignored directory is only entered when a later pattern may include some of its files again
+        kept = []
+        for d in sorted(subdirs):
+            path = f'{prefix}{d}'
+            if is_ignored(path, True, patterns, parent_ignored):
+                if not is_included_below(path, patterns):
+                    continue
+                ignored_dirs.add(path)
+            kept.append(d)
+        subdirs[:] = kept
+
+        for filename in sorted(filenames):
+            if not is_ignored(f'{prefix}{filename}', False, patterns, parent_ignored):
+                files.append(f'{prefix}{filename}')
+
+    return sorted(files)
+
+
+def get_compression(name):
+    return COMPRESSION_METHODS.get(name or DEFAULT_COMPRESSION)
+
+
+def is_valid_compression_level(name, level):
+    low, high = COMPRESSION_LEVELS.get(name or DEFAULT_COMPRESSION, (None, None))
+    return low is not None and low <= level <= high
+
+
+def create_zip_info(filename, path, compress_type=zipfile.ZIP_STORED, compress_level=None):
+    info = zipfile.ZipInfo(filename, date_time=ARCHIVE_DATE_TIME)
+    file_stat = os.stat(path)
+    info.create_system = 3
+    info.external_attr = (stat.S_IFREG | (EXECUTABLE_MODE if file_stat.st_mode & stat.S_IXUSR else FILE_MODE)) << 16
+    info.file_size = file_stat.st_size
+    info.compress_type = compress_type
+    # ZipFile.open() has no compression level argument, it is read from the entry like in ZipFile.writestr()
+    info._compresslevel = compress_level
+    return info
+
+
+def write_archive(dir_path, fileobj, compression=None, compression_level=None):
+    compress_type = get_compression(compression)
+
+    with zipfile.ZipFile(fileobj, 'w', compression=compress_type) as zip_archive:
+        for filename in list_files(dir_path):
+            path = os.path.join(dir_path, *filename.split('/'))
+            info = create_zip_info(filename, path, compress_type, compression_level)
+            with open(path, 'rb') as f, zip_archive.open(info, 'w') as entry:
+                shutil.copyfileobj(f, entry)
+
+
+def archive_digest(fileobj, chunk_size=65536):
+    digest = hashlib.sha256()
+
+    with zipfile.ZipFile(fileobj, 'r') as zip_archive:
+        for info in sorted(zip_archive.infolist(), key=lambda i: i.filename):
+            digest.update(f'{info.filename}\0{info.file_size}\0'.encode('utf-8'))
+            with zip_archive.open(info) as f:
+                for chunk in iter(lambda: f.read(chunk_size), b''):
+                    digest.update(chunk)
+
+    return digest.hexdigest()
@@ -1,17 +1,28 @@
 import configparser
 import os
 
-import yaml
-
 from .errors import InvalidConfigError, InvalidRequirementsError, InvalidChartDefinitionError
-from .helpers import is_readable_dir, is_readable_file
+from .helpers import is_readable_dir, is_readable_file, parse_size
+from .versions import is_version_range
 
 
 class Config:
-    def __init__(self, server_url, email, password):
+    def __init__(self, server_url, email, password, cache_dir=None, cache_size=None, cache_ttl=None,
+                 connect_timeout=None, read_timeout=None, retries=None, pool_size=None, page_size=None,
+                 compression=None, compression_level=None):
         self.server_url = server_url
         self.email = email
         self.password = password
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.pool_size = pool_size
+        self.page_size = page_size
+        self.compression = compression
+        self.compression_level = compression_level
 
 
 class Requirement:
@@ -21,6 +32,14 @@ class Requirement:
         self.file = file
 
 
+class LockedRequirement:
+    def __init__(self, chart_name, version, digest, size):
+        self.chart_name = chart_name
+        self.version = version
+        self.digest = digest
+        self.size = size
+
+
 class ChartDefinition:
     def __init__(self, name, version):
         self.name = name
@@ -52,18 +71,73 @@ def parse_config(config_path=None):
     if not password:
         raise InvalidConfigError('Missing user password option')
 
-    return Config(server_url, email, password)
+    cache_dir = config['swing'].get('cache_dir')
+    cache_size = config['swing'].get('cache_size')
+
+    if cache_dir:
+        cache_dir = os.path.expanduser(cache_dir)
+
+    if cache_size:
+        cache_size = parse_size(cache_size)
+        if cache_size is None:
+            raise InvalidConfigError('Invalid cache size option')
+
+    cache_ttl = read_number_option(config['swing'], 'cache_ttl', int)
+    connect_timeout = read_number_option(config['swing'], 'connect_timeout', float)
+    read_timeout = read_number_option(config['swing'], 'read_timeout', float)
+    retries = read_number_option(config['swing'], 'retries', int)
+    pool_size = read_number_option(config['swing'], 'pool_size', int)
+    page_size = read_number_option(config['swing'], 'page_size', int)
+
+    if pool_size is not None and pool_size < 1:
+        raise InvalidConfigError('Invalid pool_size option')
+
+    compression, compression_level = read_compression_options(config['swing'])
+
+    return Config(server_url, email, password, cache_dir, cache_size, cache_ttl,
+                  connect_timeout, read_timeout, retries, pool_size, page_size, compression, compression_level)
+
+
+def read_compression_options(section):
+    from .packaging import get_compression, is_valid_compression_level
+
+    compression = section.get('compression')
+    if compression is not None and get_compression(compression) is None:
+        raise InvalidConfigError(f'Unsupported compression \'{compression}\'')
+
+    compression_level = read_number_option(section, 'compression_level', int)
+    if compression_level is not None and not is_valid_compression_level(compression, compression_level):
+        raise InvalidConfigError('Invalid compression_level option')
+
+    return compression, compression_level
+
+
+def read_number_option(section, name, number_type):
+    value = section.get(name)
+    if value is None:
+        return None
+
+    try:
+        number = number_type(value)
+    except ValueError:
+        raise InvalidConfigError(f'Invalid {name} option')
+
+    if number < 0:
+        raise InvalidConfigError(f'Invalid {name} option')
+
+    return number
 
 
-def parse_requirements(requirements_path):
+def parse_requirements(requirements_path, base_dir=None):
+    from .yaml_utils import load_yaml_file, YAMLError
+
     if not is_readable_file(requirements_path):
         raise InvalidRequirementsError(f'Invalid requirements file path ({requirements_path})')
 
-    with open(requirements_path, 'r') as f:
-        try:
-            yaml_file = yaml.safe_load(f)
-        except yaml.YAMLError:
-            raise InvalidRequirementsError('Requirements are not valid yaml file')
+    try:
+        yaml_file = load_yaml_file(requirements_path)
+    except YAMLError:
+        raise InvalidRequirementsError('Requirements are not valid yaml file')
 
     dependencies = yaml_file.get('dependencies')
 
@@ -79,23 +153,74 @@ def parse_requirements(requirements_path):
         if not d.get('file') and not d.get('version'):
             raise InvalidRequirementsError('Requirement\'s version has to be specified')
 
-        if d.get('file') and not is_readable_dir(d.get('file')):
+        if str(d.get('version'))[:1] in ('^', '~') and not is_version_range(d.get('version')):
+            raise InvalidRequirementsError(f'Requirement\'s version range \'{d.get("version")}\' is not valid')
+
+        file = d.get('file')
+        if file and base_dir:
+            file = os.path.join(base_dir, file)
+
+        if file and not is_readable_dir(file):
             raise InvalidRequirementsError('Requirement\'s directory is not valid')
 
-        requirements.append(Requirement(d.get('name'), d.get('version'), d.get('file')))
+        requirements.append(Requirement(d.get('name'), d.get('version'), file))
 
     return requirements
 
 
+def parse_lock(lock_path):
+    from .yaml_utils import load_yaml_file, YAMLError
+
+    if not is_readable_file(lock_path):
+        raise InvalidRequirementsError(f'Invalid lock file path ({lock_path})')
+
+    try:
+        yaml_file = load_yaml_file(lock_path)
+    except YAMLError:
+        raise InvalidRequirementsError('Lock file is not valid yaml file')
+
+    if not isinstance(yaml_file, dict) or not isinstance(yaml_file.get('dependencies'), list):
+        raise InvalidRequirementsError('Lock file missing dependencies attribute')
+
+    locked = {}
+
+    for d in yaml_file.get('dependencies'):
+        if not d.get('name') or not d.get('version') or not d.get('sha256') or d.get('size') is None:
+            raise InvalidRequirementsError('Locked requirement has to have name, version, sha256 and size')
+
+        locked[d.get('name')] = LockedRequirement(d.get('name'), str(d.get('version')), d.get('sha256'), d.get('size'))
+
+    return locked
+
+
 def parse_chart_definition(definition_path):
+    from .yaml_utils import load_yaml_file, YAMLError
+
     if not is_readable_file(definition_path):
         raise InvalidChartDefinitionError('No definition file')
 
-    with open(definition_path, 'r') as f:
-        try:
-            definition_yaml = yaml.safe_load(f)
-        except yaml.YAMLError:
-            raise InvalidChartDefinitionError('Invalid definition file')
+    try:
+        definition_yaml = load_yaml_file(definition_path)
+    except YAMLError:
+        raise InvalidChartDefinitionError('Invalid definition file')
+
+    return create_chart_definition(definition_yaml)
+
+
+def read_chart_definition(definition_file):
+    from .yaml_utils import load_yaml, YAMLError
+
+    try:
+        definition_yaml = load_yaml(definition_file)
+    except YAMLError:
+        raise InvalidChartDefinitionError('Invalid definition file')
+
+    return create_chart_definition(definition_yaml)
+
+
+def create_chart_definition(definition_yaml):
+    if not isinstance(definition_yaml, dict):
+        raise InvalidChartDefinitionError('Invalid definition file')
 
     chart_name = definition_yaml.get('name')
     version = definition_yaml.get('version')
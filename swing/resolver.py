@@ -0,0 +1,184 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .errors import SwingCoreError, InvalidRequirementsError
+from .helpers import select_yaml
+from .parsers import Requirement, parse_requirements, parse_chart_definition
+from .versions import is_version_range, matches_version, select_version
+
+
+class ChartNode:
+    def __init__(self, requirement, version, dependencies):
+        self.requirement = requirement
+        self.version = version
+        self.dependencies = dependencies
+
+    @property
+    def name(self):
+        return self.requirement.chart_name
+
+
+def get_requirement_key(requirement):
+    if requirement.file:
+        return 'file', os.path.abspath(requirement.file)
+    return 'chart', requirement.chart_name, str(requirement.version)
+
+
+def format_source(requirement):
+    if requirement.file:
+        return f'\'{requirement.chart_name}\' from \'{requirement.file}\''
+    return f'\'{requirement.chart_name}-{requirement.version}\''
+
+
+def format_path(path):
+    return ' -> '.join(path)
+
+
+class DependencyResolver:
+    def __init__(self, api=None, jobs=1, remote_dependencies=True, index=None, lock=None, index_loader=None):
+        self.api = api
+        self.jobs = jobs
+        self.remote_dependencies = remote_dependencies
+        self.index = index
+        self.index_loader = index_loader
+        self.locked = lock or {}
+        self.nodes = {}
+        self.lock = threading.Lock()
+        self.index_lock = threading.Lock()
+
+    def get_index(self):
+        # the index is only loaded once a remote requirement needs it, local charts install without the server
+        with self.index_lock:
+            if self.index_loader:
+                self.index = self.index_loader()
+                self.index_loader = None
+            return self.index
+
+    def find_version(self, chart_name, spec):
+        locked = self.locked.get(chart_name)
+        if locked:
+            return locked.version if matches_version(locked.version, spec) else None
+
+        index = self.get_index()
+        if index:
+            return index.resolve_version(chart_name, spec)
+
+        if self.api and self.remote_dependencies:
+            return select_version([str(r.version) for r in self.api.list_releases(chart_name, revalidate=True)], spec)
+
+        return None
+
+    def pin_version(self, requirement):
+        if requirement.file or not is_version_range(requirement.version):
+            return requirement
+
+        version = self.find_version(requirement.chart_name, requirement.version)
+        if not version:
+            raise SwingCoreError(f'No release of \'{requirement.chart_name}\' matches \'{requirement.version}\'.')
+
+        return Requirement(requirement.chart_name, version)
+
+    def read_file_node(self, requirement):
+        definition_file = select_yaml(requirement.file, 'chart')
+        if not definition_file:
+            raise SwingCoreError(f'Requirement {format_source(requirement)} has no chart definition.')
+
+        definition = parse_chart_definition(os.path.join(requirement.file, definition_file))
+
+        dependencies = []
+        requirements_file = select_yaml(requirement.file, 'requirements')
+        if requirements_file:
+            try:
+                dependencies = parse_requirements(os.path.join(requirement.file, requirements_file),
+                                                  base_dir=requirement.file)
+            except InvalidRequirementsError as e:
+                raise SwingCoreError(f'Requirements of {format_source(requirement)} are invalid: {e.message}')
+
+        return ChartNode(requirement, str(definition.version), [self.pin_version(d) for d in dependencies])
+
+    def read_remote_node(self, requirement):
+        version = str(requirement.version)
+        if not self.remote_dependencies:
+            return ChartNode(requirement, version, [])
+
+        index = self.get_index()
+        if index:
+            release = index.find_release(requirement.chart_name, version)
+        else:
+            release = self.api.find_release(requirement.chart_name, version, refresh=False, revalidate=True)
+
+        if not release:
+            raise SwingCoreError(f'Requirement {format_source(requirement)} was not found in the repository.')
+
+        dependencies = []
+        for d in release.dependencies or []:
+            if not d.get('name') or not d.get('version'):
+                raise SwingCoreError(f'Dependencies of {format_source(requirement)} are invalid.')
+            dependencies.append(self.pin_version(Requirement(d.get('name'), str(d.get('version')))))
+
+        return ChartNode(requirement, version, dependencies)
+
+    def get_node(self, requirement):
+        key = get_requirement_key(requirement)
+        with self.lock:
+            if key in self.nodes:
+                return self.nodes[key]
+
+        node = self.read_file_node(requirement) if requirement.file else self.read_remote_node(requirement)
+
+        with self.lock:
+            return self.nodes.setdefault(key, node)
+
+    def fetch_nodes(self, requirements):
+        frontier = list(requirements)
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            while frontier:
+                unique = {get_requirement_key(r): r for r in frontier if get_requirement_key(r) not in self.nodes}
+                nodes = list(executor.map(self.get_node, unique.values()))
+                frontier = [d for node in nodes for d in node.dependencies]
+
+    def resolve(self, requirements):
+        requirements = [self.pin_version(r) for r in requirements]
+        self.fetch_nodes(requirements)
+
+        resolved = []
+        selected = {}
+        visiting = set()
+        done = set()
+
+        def visit(requirement, path):
+            key = get_requirement_key(requirement)
+            node = self.nodes[key]
+            path = path + [node.name]
+
+            if node.name in selected:
+                other_key, version, other_path, other = selected[node.name]
+                if version != node.version:
+                    raise SwingCoreError(f'Requirement {format_source(requirement)} ({format_path(path)}) conflicts '
+                                         f'with {format_source(other)} ({format_path(other_path)}).')
+
+                # the same version from another source (a local directory or the repository) is installed only once
+                if other_key != key:
+                    return
+
+            if key in visiting:
+                raise SwingCoreError(f'Requirements contain a cycle: {format_path(path)}.')
+
+            if key in done:
+                return
+
+            selected[node.name] = key, node.version, path, requirement
+            visiting.add(key)
+            for dependency in node.dependencies:
+                visit(dependency, path)
+            visiting.remove(key)
+
+            done.add(key)
+            resolved.append(node.requirement)
+
+        for r in requirements:
+            visit(r, [])
+
+        return resolved
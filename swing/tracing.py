@@ -0,0 +1,122 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Span:
+    def __init__(self, name, start, duration, pid, tid, args=None):
+        self.name = name
+        self.start = start
+        self.duration = duration
+        self.pid = pid
+        self.tid = tid
+        self.args = args or {}
+
+    def to_event(self, origin):
+        return {
+            'name': self.name,
+            'cat': 'swing',
+            'ph': 'X',
+            'ts': round((self.start - origin) * 1000000, 3),
+            'dur': round(self.duration * 1000000, 3),
+            'pid': self.pid,
+            'tid': self.tid,
+            'args': self.args,
+        }
+
+
+class PhaseSummary:
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @property
+    def average(self):
+        return self.total / self.calls if self.calls else 0.0
+
+    def add(self, duration):
+        self.calls += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.spans = []
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+        self.origin = time.perf_counter()
+
+    def reset(self):
+        with self.lock:
+            self.spans = []
+
+    @contextmanager
+    def span(self, name, **args):
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.add([Span(name, start, duration, os.getpid(), threading.get_ident(), args)])
+
+    def add(self, spans):
+        with self.lock:
+            self.spans.extend(spans)
+
+    def summarize(self):
+        phases = {}
+        for span in self.spans:
+            if span.name not in phases:
+                phases[span.name] = PhaseSummary(span.name)
+            phases[span.name].add(span.duration)
+        return sorted(phases.values(), key=lambda p: p.total, reverse=True)
+
+    def summarize_requirements(self, limit=None):
+        requirements = {}
+        for span in self.spans:
+            name = span.args.get('requirement')
+            if span.name != 'requirement' or not name:
+                continue
+
+            if name not in requirements:
+                requirements[name] = PhaseSummary(name)
+            requirements[name].add(span.duration)
+
+        return sorted(requirements.values(), key=lambda p: p.total, reverse=True)[:limit]
+
+    def write_trace(self, path, metadata=None):
+        events = [span.to_event(self.origin) for span in sorted(self.spans, key=lambda s: s.start)]
+        temp_path = f'{path}.part'
+        with open(temp_path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': metadata or {}}, f)
+        os.replace(temp_path, path)
+
+
+tracer = Tracer()
+
+
+def span(name, **args):
+    return tracer.span(name, **args)
+
+
+def run_traced(enabled, func, *args):
+    tracer.enabled = enabled
+    if not enabled:
+        return func(*args), []
+
+    first = len(tracer.spans)
+    result = func(*args)
+    return result, tracer.spans[first:]
@@ -0,0 +1,78 @@
+import re
+
+version_regex = re.compile(r'^v?(\d+)(?:\.(\d+))?(?:\.(\d+))?(?:-([0-9A-Za-z.-]+))?(?:\+.*)?$')
+range_regex = re.compile(r'^([\^~])\s*(v?\d+(?:\.\d+){0,2}(?:-[0-9A-Za-z.-]+)?)$')
+
+
+def parse_version(version):
+    match = version_regex.match(str(version).strip())
+    if not match:
+        return None
+    return tuple(int(part or 0) for part in match.groups()[:3])
+
+
+def parse_prerelease(version):
+    match = version_regex.match(str(version).strip())
+    return match.group(4) if match else None
+
+
+def get_version_key(version):
+    parsed = parse_version(version)
+    if parsed is None:
+        return None
+
+    prerelease = parse_prerelease(version)
+    if not prerelease:
+        return parsed + (1, ())
+
+    # a pre-release ranks below its release, numeric identifiers rank below alphanumeric ones
+    identifiers = tuple((0, int(i), '') if i.isdigit() else (1, 0, i) for i in prerelease.split('.'))
+    return parsed + (0, identifiers)
+
+
+def is_version_range(spec):
+    return bool(range_regex.match(str(spec).strip()))
+
+
+def get_range_bounds(spec):
+    match = range_regex.match(str(spec).strip())
+    if not match:
+        return None
+
+    operator, version = match.groups()
+    parts = [int(p) for p in version.lstrip('v').split('-')[0].split('.')]
+    lower = get_version_key(version)
+
+    if operator == '~':
+        # ~1.2.3 and ~1.2 allow patch updates, ~1 allows minor updates
+        upper = (parts[0] + 1, 0, 0) if len(parts) == 1 else (parts[0], parts[1] + 1, 0)
+    else:
+        # ^ allows updates that do not change the left-most non-zero part
+        index = next((i for i, p in enumerate(parts) if p != 0), len(parts) - 1)
+        upper = tuple(parts[:index]) + (parts[index] + 1,) + (0,) * (2 - index)
+
+    return lower, upper + (0, ())
+
+
+def matches_version(version, spec):
+    key = get_version_key(version)
+    if key is None:
+        return False
+
+    bounds = get_range_bounds(spec)
+    if not bounds:
+        return key == get_version_key(spec) or str(version) == str(spec)
+
+    lower, upper = bounds
+    # pre-releases only match a range naming a pre-release of the same version
+    if parse_prerelease(version) and (lower[3] or key[:3] != lower[:3]):
+        return False
+
+    return lower <= key < upper
+
+
+def select_version(versions, spec):
+    candidates = [v for v in versions if matches_version(v, spec)]
+    if not candidates:
+        return None
+    return max(candidates, key=get_version_key)
@@ -1,10 +1,14 @@
-from typing import List
+from itertools import islice
+from typing import Iterable, TYPE_CHECKING
 
 import click
-from tabulate import tabulate
 
-from .api import Release, Chart
-from .helpers import format_date
+from .helpers import format_date, format_size
+
+if TYPE_CHECKING:
+    from .api import Release, Chart
+
+TABLE_BATCH_SIZE = 50
 
 
 def print_error(message):
@@ -30,21 +34,90 @@ def print_process(message):
     print_info(f'   -> {message}')
 
 
-def print_charts(charts: List[Chart], query=None):
-    if not len(charts):
+def format_cell(value):
+    return '' if value is None else str(value)
+
+
+def format_row(row, widths):
+    return '  '.join(format_cell(value).ljust(width) for value, width in zip(row, widths)).rstrip()
+
+
+def print_table(rows, headers, batch_size=TABLE_BATCH_SIZE):
+    rows = iter(rows)
+    batch = list(islice(rows, batch_size))
+    if not batch:
+        return False
+
+    widths = [max(len(format_cell(value)) for value in column) for column in zip(headers, *batch)]
+    print_info(format_row(headers, widths))
+    print_info(format_row(['-' * width for width in widths], widths))
+
+    while batch:
+        for row in batch:
+            print_info(format_row(row, widths))
+        batch = list(islice(rows, batch_size))
+
+    return True
+
+
+def print_charts(charts: Iterable['Chart'], query=None):
+    table = ([c.name, c.description] for c in charts)
+    if not print_table(table, headers=['Name', 'Description']):
         if not query:
             print_warning('No charts uploaded to the repository.')
         else:
             print_warning(f'No charts found for query \'{query}\'')
-    else:
-        table = ([c.name, c.description] for c in charts)
-        print_info(tabulate(table, headers=['Name', 'Description']))
 
 
-def print_releases(releases: List[Release], chart_name):
-    if not len(releases):
+def print_releases(releases: Iterable['Release'], chart_name):
+    table = ([r.version, format_date(r.release_date), r.notes] for r in releases)
+    if not print_table(table, headers=['Version', 'Published date', 'Release notes']):
         print_warning(f'No releases found for chart \'{chart_name}\'')
-    else:
-        table = ([r.version, format_date(r.release_date), r.notes] for r in releases)
-        print_info(tabulate(table, headers=['Version', 'Published date', 'Release notes']))
 
+
+def print_cache_stats(stats):
+    from tabulate import tabulate
+
+    table = [
+        ['Location', stats.path],
+        ['Archives', stats.entries],
+        ['Templates', stats.templates],
+        ['Size', format_size(stats.size)],
+        ['Size limit', format_size(stats.max_size)],
+    ]
+    print_info(tabulate(table, tablefmt='plain'))
+
+
+def print_publish_summary(results):
+    print_info('')
+    print_table(([chart_dir, status, message] for chart_dir, status, message in results),
+                headers=['Chart', 'Status', 'Message'])
+
+    counts = {}
+    for _, status, _ in results:
+        counts[status] = counts.get(status, 0) + 1
+
+    print_info('')
+    print_info(', '.join(f'{count} {status}' for status, count in counts.items()))
+
+
+def format_duration(seconds):
+    return f'{seconds * 1000:.1f} ms'
+
+
+def print_timings(phases, requirements, api_stats=None):
+    print_info('')
+    print_table(([p.name, p.calls, format_duration(p.total), format_duration(p.average), format_duration(p.max)]
+                 for p in phases), headers=['Phase', 'Calls', 'Total', 'Average', 'Max'])
+
+    if requirements:
+        print_info('')
+        print_table(([r.name, format_duration(r.total)] for r in requirements),
+                    headers=['Requirement', 'Total'])
+
+    if api_stats and api_stats.requests:
+        print_info('')
+        print_info(f'HTTP requests: {api_stats.requests} ({api_stats.successes} succeeded, '
+                   f'{api_stats.failures} failed, {api_stats.retries} retried), '
+                   f'average latency {format_duration(api_stats.average_latency)}, '
+                   f'max latency {format_duration(api_stats.max_latency)}')
@@ -0,0 +1,52 @@
+import copy
+import os
+import threading
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+
+YAMLError = yaml.YAMLError
+
+file_cache = {}
+file_cache_lock = threading.Lock()
+
+
+def load_yaml(stream, loader=None):
+    return yaml.load(stream, Loader=loader or SafeLoader)
+
+
+def dump_yaml(data, stream=None, dumper=None, **kwargs):
+    return yaml.dump(data, stream, Dumper=dumper or SafeDumper, **kwargs)
+
+
+def get_file_key(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def load_yaml_file(path):
+    path = os.path.abspath(path)
+    key = get_file_key(path)
+
+    with file_cache_lock:
+        cached = file_cache.get(path)
+
+    if cached and cached[0] == key:
+        return copy.deepcopy(cached[1])
+
+    with open(path, 'r') as f:
+        data = load_yaml(f)
+
+    with file_cache_lock:
+        file_cache[path] = (key, data)
+
+    return copy.deepcopy(data)
+
+
+def clear_file_cache():
+    with file_cache_lock:
+        file_cache.clear()
@@ -1,7 +1,15 @@
+import json
 import os
+import shutil
+import threading
+from email.parser import BytesParser
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
 import betamax
 
 from swing.api import ApiService
+from swing.core import SwingCore
+from swing.parsers import Requirement
 
 
 def get_fixtures_path():
@@ -20,3 +28,53 @@ def get_test_api(betamax_session):
         server_url='http://localhost:5000',
         session=betamax_session
     )
+
+
+def prepare_chart(chart_path):
+    demo_path = os.path.join(get_fixtures_path(), 'demo')
+    shutil.copy(os.path.join(demo_path, 'values.yaml'), str(chart_path))
+
+    core = SwingCore(api=None)
+    requirements = [
+        Requirement('redis', file=os.path.join(demo_path, 'redis')),
+        Requirement('psql', file=os.path.join(demo_path, 'psql')),
+    ]
+    core.install_requirements(requirements, str(chart_path / 'charts'))
+    return core
+
+
+class JsonHandler(BaseHTTPRequestHandler):
+    @classmethod
+    def reset(cls):
+        pass
+
+    def read_multipart(self):
+        content_type = self.headers['Content-Type']
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        message = BytesParser().parsebytes(f'Content-Type: {content_type}\r\n\r\n'.encode('utf-8') + body)
+        return message.get_payload()
+
+    def send_body(self, status, payload=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_json(self, data, status=200, headers=None):
+        headers = {'Content-Type': 'application/json', **(headers or {})}
+        self.send_body(status, json.dumps(data).encode('utf-8'), headers)
+
+    def log_message(self, *args):
+        pass
+
+
+def run_server(handler):
+    handler.reset()
+    server = HTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
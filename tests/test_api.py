@@ -1,9 +1,23 @@
+import asyncio
+import hashlib
+import io
+import itertools
+import logging
 import pytest
 import os
+import re
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
 
-from swing.api import ApiService
-from swing.errors import ApiHttpError
-from helpers import get_fixtures_path, get_test_api
+from swing.api import ApiService, MultipartBody
+from swing.async_api import AsyncApiService
+from swing.cache import ResponseCache, SessionStore
+from swing.core import SwingCore, PUBLISHED, SKIPPED, FAILED
+from swing.errors import ApiHttpError, SwingCoreError
+from swing.packaging import archive_digest
+from swing.parsers import Requirement
+from helpers import get_fixtures_path, get_test_api, JsonHandler, run_server
 
 
 @pytest.fixture
@@ -47,6 +61,36 @@ def test_download_release(client: ApiService):
 def test_download_release_no_version(client: ApiService):
     with pytest.raises(ApiHttpError):
         client.download_release('redis', '5.2.2')
+
+
+def test_save_release(client: ApiService, tmp_path):
+    path = str(tmp_path / 'redis-1.0.0.zip')
+    digest = client.save_release('redis', '1.0.0', path, chunk_size=512)
+
+    with open(path, 'rb') as f:
+        assert digest == hashlib.sha256(f.read()).hexdigest()
+    assert not os.path.exists(f'{path}.part')
+
+
+def test_save_release_resume(client: ApiService, tmp_path):
+    path = str(tmp_path / 'redis-1.0.0.zip')
+    with open(f'{path}.part', 'wb') as f:
+        f.write(b'truncated')
+
+    digest = client.save_release('redis', '1.0.0', path)
+
+    with open(path, 'rb') as f:
+        content = f.read()
+    assert not content.startswith(b'truncated')
+    assert digest == hashlib.sha256(content).hexdigest()
+
+
+def test_save_release_no_version(client: ApiService, tmp_path):
+    path = str(tmp_path / 'redis-5.2.2.zip')
+    with pytest.raises(ApiHttpError):
+        client.save_release('redis', '5.2.2', path)
+
+    assert not os.path.exists(path)
         
 
 def test_upload_release(client: ApiService):
@@ -65,8 +109,624 @@ def test_upload_release_invalid_chart(client: ApiService):
             client.upload_release(f, 'redis', '2.0.0')
             
             
+class UploadHandler(JsonHandler):
+    @classmethod
+    def reset(cls):
+        cls.uploads = []
+
+    def do_POST(self):
+        if self.path == '/login':
+            return self.send_json({'email': 'user123@gmail.com'})
+
+        parts = {p.get_param('name', header='content-disposition'): p.get_payload(decode=True)
+                 for p in self.read_multipart()}
+        self.uploads.append(parts)
+
+        self.send_json({'version': '3.0.0', 'notes': parts['notes'].decode('utf-8')})
+
+
+class ChartsHandler(JsonHandler):
+    etag = '"charts-1"'
+
+    @classmethod
+    def reset(cls):
+        cls.requests = []
+        cls.index_requests = 0
+
+    def do_GET(self):
+        if self.path == '/index':
+            ChartsHandler.index_requests += 1
+            return self.send_body(404)
+
+        self.requests.append(self.headers.get('If-None-Match'))
+
+        if self.headers.get('If-None-Match') == self.etag:
+            return self.send_body(304)
+
+        self.send_json([{'name': 'redis', 'description': 'Basic redis chart'}], headers={'ETag': self.etag})
+
+
+class SessionHandler(JsonHandler):
+    @classmethod
+    def reset(cls):
+        cls.tokens = set()
+        cls.uploads = []
+        cls.logins = 0
+
+    def do_POST(self):
+        if self.path == '/login':
+            SessionHandler.logins += 1
+            token = f'token-{SessionHandler.logins}'
+            self.tokens.add(token)
+            return self.send_json({'email': 'user123@gmail.com'}, headers={'Set-Cookie': f'session={token}; Path=/'})
+
+        parts = self.read_multipart()
+        token = (self.headers.get('Cookie') or '').replace('session=', '')
+        if token not in self.tokens:
+            return self.send_json({'description': 'Unauthorized', 'code': 401}, 401)
+
+        self.uploads.append(next(p for p in parts if p.get_filename()).get_payload(decode=True))
+
+        # every upload rotates the session token
+        self.tokens.remove(token)
+        self.tokens.add(f'{token}+')
+        self.send_json({'version': '3.0.0'}, headers={'Set-Cookie': f'session={token}+; Path=/'})
+
+
+class FlakyHandler(JsonHandler):
+    @classmethod
+    def reset(cls):
+        cls.failures = 0
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.respond()
+
+    def respond(self):
+        if FlakyHandler.failures > 0:
+            FlakyHandler.failures -= 1
+            return self.send_body(503)
+
+        self.send_json({'email': 'user123@gmail.com'})
+
+
+class PagedHandler(JsonHandler):
+    charts = [{'name': f'chart-{i}', 'description': f'Chart {i}'} for i in range(7)]
+
+    @classmethod
+    def reset(cls):
+        cls.pages = []
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        page, limit = int(query['page'][0]), int(query['limit'][0])
+        self.pages.append(page)
+
+        self.send_json(self.charts[(page - 1) * limit:page * limit])
+
+
+class ReleasesHandler(JsonHandler):
+    @classmethod
+    def reset(cls):
+        cls.releases = {}
+        cls.uploads = []
+        cls.logins = 0
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        chart = query['chart'][0]
+        version = query.get('version', [None])[0]
+
+        if not any(c == chart for c, _ in self.releases):
+            return self.send_json({'description': f'Chart {chart} not found', 'code': 404}, 404)
+
+        self.send_json([{'version': v, 'digest': d} for (c, v), d in self.releases.items()
+                        if c == chart and (not version or v == version)])
+
+    def do_POST(self):
+        if self.path == '/login':
+            ReleasesHandler.logins += 1
+            return self.send_json({'email': 'user123@gmail.com'})
+
+        part = next(p for p in self.read_multipart() if p.get_filename())
+        archive = part.get_payload(decode=True)
+        chart, version = part.get_filename()[:-len('.zip')].rsplit('-', 1)
+
+        self.uploads.append(archive)
+        if (chart, version) in self.releases:
+            return self.send_json({'description': 'Release already exists', 'code': 409}, 409)
+        self.releases[(chart, version)] = archive_digest(io.BytesIO(archive))
+        self.send_json({'version': version, 'archiveUrl': f'/release/{part.get_filename()}'})
+
+
+class IndexHandler(JsonHandler):
+    etag = '"index-1"'
+    index = {
+        'apiVersion': 1,
+        'charts': {
+            'web': {
+                'description': 'Web application',
+                'releases': [
+                    {'version': '1.0.0'},
+                    {'version': '1.2.0', 'dependencies': [{'name': 'redis', 'version': '~1.0'}]},
+                    {'version': '2.0.0'},
+                ],
+            },
+            'redis': {
+                'description': 'Basic redis chart',
+                'releases': [{'version': '1.0.0'}, {'version': '1.0.3'}, {'version': '1.1.0'}],
+            },
+        },
+    }
+
+    @classmethod
+    def reset(cls):
+        cls.requests = []
+
+    def do_GET(self):
+        self.requests.append(self.path)
+
+        if self.path.startswith('/release/'):
+            with open(os.path.join(get_fixtures_path(), 'charts', 'valid.zip'), 'rb') as f:
+                return self.send_body(200, f.read())
+
+        if self.headers.get('If-None-Match') == self.etag:
+            return self.send_body(304)
+
+        self.send_json(self.index, headers={'ETag': self.etag})
+
+
+class RangeHandler(JsonHandler):
+    payload = bytes(range(256)) * 64
+    etag = '"archive-1"'
+
+    @classmethod
+    def reset(cls):
+        cls.requests = []
+        cls.range_start = None
+
+    def do_GET(self):
+        self.requests.append((self.headers.get('Range'), self.headers.get('If-Range')))
+
+        match = re.match(r'^bytes=(\d+)-$', self.headers.get('Range') or '')
+        if match and self.headers.get('If-Range') == self.etag:
+            start = int(match.group(1)) if self.range_start is None else self.range_start
+            content_range = f'bytes {start}-{len(self.payload) - 1}/{len(self.payload)}'
+            return self.send_body(206, self.payload[start:], {'ETag': self.etag, 'Content-Range': content_range})
+
+        self.send_body(200, self.payload, {'ETag': self.etag})
+
+
+@pytest.fixture
+def upload_server():
+    yield from run_server(UploadHandler)
+
+
+@pytest.fixture
+def charts_server():
+    yield from run_server(ChartsHandler)
+
+
+@pytest.fixture
+def session_server():
+    yield from run_server(SessionHandler)
+
+
+@pytest.fixture
+def paged_server():
+    yield from run_server(PagedHandler)
+
+
+@pytest.fixture
+def flaky_server():
+    yield from run_server(FlakyHandler)
+
+
+@pytest.fixture
+def index_server():
+    yield from run_server(IndexHandler)
+
+
+@pytest.fixture
+def range_server():
+    yield from run_server(RangeHandler)
+
+
+@pytest.fixture
+def releases_server():
+    yield from run_server(ReleasesHandler)
+
+
+def test_upload_release_streaming(upload_server):
+    client = ApiService(upload_server, 'user123@gmail.com', 'pass123')
+    path = os.path.join(get_fixtures_path(), 'charts', 'valid.zip')
+
+    with open(path, 'rb') as f:
+        body = MultipartBody({'notes': 'Testing release'}, {'chart': ('redis-3.0.0.zip', f)}, chunk_size=128)
+        assert len(body) == len(b''.join(body))
+
+        f.seek(0)
+        release = client.upload_release(f, 'redis', '3.0.0', 'Testing release')
+
+    with open(path, 'rb') as f:
+        assert UploadHandler.uploads[-1]['chart'] == f.read()
+    assert release.notes == 'Testing release'
+
+
 def test_login(client: ApiService):
     user = client.login()
     
     assert user is not None
     assert user.email == 'user123@gmail.com'
+
+
+def test_list_charts_revalidation(charts_server, tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=0)
+    client = ApiService(charts_server, 'user123@gmail.com', 'pass123', response_cache=cache)
+
+    first = client.list_charts()
+    second = client.list_charts()
+    refreshed = client.list_charts(refresh=True)
+
+    assert [c.name for c in first] == [c.name for c in second] == [c.name for c in refreshed] == ['redis']
+    assert ChartsHandler.requests == [None, ChartsHandler.etag, None]
+
+
+def test_list_charts_fresh_cache(charts_server, tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=60)
+    client = ApiService(charts_server, 'user123@gmail.com', 'pass123', response_cache=cache)
+
+    client.list_charts()
+    charts = list(client.list_charts())
+
+    assert charts[0].name == 'redis'
+    assert len(ChartsHandler.requests) == 1
+
+
+def save_partial_release(client, path, size):
+    client.save_release('redis', '1.0.0', path)
+    with open(path, 'rb') as f:
+        content = f.read()
+    os.remove(path)
+
+    with open(f'{path}.part', 'wb') as f:
+        f.write(content[:size])
+    with open(f'{path}.part.validator', 'w') as f:
+        f.write(RangeHandler.etag)
+    RangeHandler.requests.clear()
+
+
+def test_save_release_partial_content(range_server, tmp_path):
+    client = ApiService(range_server, 'user123@gmail.com', 'pass123')
+    path = str(tmp_path / 'redis-1.0.0.zip')
+    save_partial_release(client, path, 1000)
+
+    digest = client.save_release('redis', '1.0.0', path)
+
+    with open(path, 'rb') as f:
+        assert f.read() == RangeHandler.payload
+    assert digest == hashlib.sha256(RangeHandler.payload).hexdigest()
+    assert RangeHandler.requests == [('bytes=1000-', RangeHandler.etag)]
+    assert not os.path.exists(f'{path}.part.validator')
+
+
+def test_save_release_changed_archive(range_server, tmp_path):
+    client = ApiService(range_server, 'user123@gmail.com', 'pass123')
+    path = str(tmp_path / 'redis-1.0.0.zip')
+    save_partial_release(client, path, 1000)
+    with open(f'{path}.part.validator', 'w') as f:
+        f.write('"archive-0"')
+
+    client.save_release('redis', '1.0.0', path)
+
+    with open(path, 'rb') as f:
+        assert f.read() == RangeHandler.payload
+    assert RangeHandler.requests == [('bytes=1000-', '"archive-0"')]
+
+
+def test_save_release_unexpected_range(range_server, tmp_path):
+    client = ApiService(range_server, 'user123@gmail.com', 'pass123')
+    path = str(tmp_path / 'redis-1.0.0.zip')
+    save_partial_release(client, path, 1000)
+    RangeHandler.range_start = 500
+
+    digest = client.save_release('redis', '1.0.0', path)
+
+    with open(path, 'rb') as f:
+        assert f.read() == RangeHandler.payload
+    assert digest == hashlib.sha256(RangeHandler.payload).hexdigest()
+    assert RangeHandler.requests == [('bytes=1000-', RangeHandler.etag), (None, None)]
+
+
+def test_upload_release_evicts_cache(releases_server, tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=60)
+    client = ApiService(releases_server, 'user123@gmail.com', 'pass123', response_cache=cache)
+    ReleasesHandler.releases[('redis', '1.0.0')] = 'digest'
+
+    assert [r.version for r in client.list_releases('redis')] == ['1.0.0']
+
+    with open(os.path.join(get_fixtures_path(), 'charts', 'valid.zip'), 'rb') as f:
+        client.upload_release(f, 'redis', '1.1.0')
+
+    assert [r.version for r in client.list_releases('redis')] == ['1.0.0', '1.1.0']
+
+
+def test_missing_index_is_cached(charts_server, tmp_path, capsys):
+    cache = ResponseCache(str(tmp_path), ttl=60)
+    core = SwingCore(ApiService(charts_server, 'user123@gmail.com', 'pass123', response_cache=cache))
+
+    core.list_charts(None)
+    core.list_charts(None)
+
+    assert 'redis' in capsys.readouterr().out
+    assert ChartsHandler.index_requests == 1
+
+
+def test_persistent_session(session_server, tmp_path):
+    store = SessionStore(str(tmp_path))
+    path = os.path.join(get_fixtures_path(), 'charts', 'valid.zip')
+
+    def upload():
+        client = ApiService(session_server, 'user123@gmail.com', 'pass123', session_store=store)
+        with open(path, 'rb') as f:
+            return client.upload_release(f, 'redis', '3.0.0')
+
+    upload()
+    upload()
+
+    assert SessionHandler.logins == 1
+    assert os.stat(store.get_path(session_server, 'user123@gmail.com')).st_mode & 0o077 == 0
+
+    SessionHandler.tokens.clear()
+    release = upload()
+
+    with open(path, 'rb') as f:
+        assert SessionHandler.uploads == [f.read()] * 3
+    assert release.version == '3.0.0'
+    assert SessionHandler.logins == 2
+
+
+def test_retry_idempotent_request(flaky_server):
+    client = ApiService(flaky_server, 'user123@gmail.com', 'pass123', retries=3, backoff=0)
+    FlakyHandler.failures = 2
+
+    response = client.request('/chart')
+
+    assert response.status_code == 200
+    assert client.stats.requests == 3
+    assert client.stats.retries == 2
+    assert client.stats.successes == 1
+
+
+def test_no_retry_of_post_request(flaky_server):
+    client = ApiService(flaky_server, 'user123@gmail.com', 'pass123', retries=3, backoff=0)
+    FlakyHandler.failures = 1
+
+    with pytest.raises(ApiHttpError):
+        client.login()
+
+    assert client.stats.requests == 1
+    assert client.stats.failures == 1
+
+
+def test_unavailable_server():
+    client = ApiService('http://127.0.0.1:1', 'user123@gmail.com', 'pass123', retries=1, backoff=0)
+
+    with pytest.raises(ApiHttpError):
+        client.list_charts()
+
+    assert client.stats.retries == 1
+    assert client.stats.failures == 1
+
+
+def test_async_list_charts(charts_server, tmp_path):
+    client = ApiService(charts_server, 'user123@gmail.com', 'pass123', pool_size=4)
+
+    async def list_all():
+        async with AsyncApiService(client, concurrency=4) as async_client:
+            return await asyncio.gather(*[async_client.list_charts() for _ in range(20)])
+
+    results = asyncio.run(list_all())
+
+    assert len(results) == 20
+    assert all(charts[0].name == 'redis' for charts in results)
+    assert client.stats.successes == 20
+
+
+def test_async_pool_sized_to_concurrency(charts_server, caplog):
+    client = ApiService(charts_server, 'user123@gmail.com', 'pass123', pool_size=2)
+
+    async def list_all():
+        async with AsyncApiService(client, concurrency=16) as async_client:
+            return await asyncio.gather(*[async_client.list_charts() for _ in range(32)])
+
+    with caplog.at_level(logging.WARNING, logger='urllib3.connectionpool'):
+        results = asyncio.run(list_all())
+
+    assert len(results) == 32
+    assert client.session.get_adapter(charts_server)._pool_maxsize == 16
+    assert 'Connection pool is full' not in caplog.text
+
+
+def test_async_close_does_not_block_loop(charts_server):
+    client = ApiService(charts_server, 'user123@gmail.com', 'pass123')
+
+    async def close_while_ticking():
+        ticks = []
+
+        async def tick():
+            while True:
+                await asyncio.sleep(0.01)
+                ticks.append(None)
+
+        ticker = asyncio.create_task(tick())
+        async with AsyncApiService(client) as async_client:
+            async_client.executor.submit(time.sleep, 0.2)
+        ticker.cancel()
+        return len(ticks)
+
+    assert asyncio.run(close_while_ticking()) > 5
+
+
+def test_list_charts_paged(paged_server):
+    client = ApiService(paged_server, 'user123@gmail.com', 'pass123', page_size=3)
+
+    charts = client.list_charts()
+    first = [c.name for c in itertools.islice(charts, 2)]
+
+    assert first == ['chart-0', 'chart-1']
+    assert PagedHandler.pages == [1]
+
+    rest = [c.name for c in charts]
+
+    assert rest == [f'chart-{i}' for i in range(2, 7)]
+    assert PagedHandler.pages == [1, 2, 3]
+
+
+def test_publish_unchanged_release(releases_server):
+    core = SwingCore(ApiService(releases_server, 'user123@gmail.com', 'pass123'))
+    chart_path = os.path.join(get_fixtures_path(), 'demo', 'redis')
+
+    assert core.publish_release(chart_path, None) == PUBLISHED
+    assert core.publish_release(chart_path, None) == SKIPPED
+    assert len(ReleasesHandler.uploads) == 1
+
+
+def test_publish_release_digest_ignores_compression(releases_server):
+    chart_path = os.path.join(get_fixtures_path(), 'demo', 'redis')
+    api = ApiService(releases_server, 'user123@gmail.com', 'pass123')
+
+    assert SwingCore(api, compression='stored').publish_release(chart_path, None) == PUBLISHED
+    assert SwingCore(api, compression='bzip2').publish_release(chart_path, None) == SKIPPED
+
+
+def test_publish_release_without_digest(releases_server):
+    core = SwingCore(ApiService(releases_server, 'user123@gmail.com', 'pass123'))
+    ReleasesHandler.releases[('redis', '1.0.0')] = None
+
+    with pytest.raises(ApiHttpError) as e:
+        core.publish_release(os.path.join(get_fixtures_path(), 'demo', 'redis'), None)
+
+    assert e.value.code == 409
+    assert len(ReleasesHandler.uploads) == 1
+
+
+def test_publish_conflicting_release(releases_server):
+    core = SwingCore(ApiService(releases_server, 'user123@gmail.com', 'pass123'))
+    ReleasesHandler.releases[('redis', '1.0.0')] = hashlib.sha256(b'other').hexdigest()
+
+    with pytest.raises(SwingCoreError) as e:
+        core.publish_release(os.path.join(get_fixtures_path(), 'demo', 'redis'), None)
+
+    assert 'different content' in e.value.message
+    assert ReleasesHandler.uploads == []
+
+
+def test_publish_release_not_chart(releases_server, tmp_path):
+    core = SwingCore(ApiService(releases_server, 'user123@gmail.com', 'pass123'))
+
+    with pytest.raises(SwingCoreError) as e:
+        core.publish_release(str(tmp_path), None)
+
+    assert 'has no chart definition' in e.value.message
+
+
+def test_publish_releases_batch(releases_server, tmp_path, capsys):
+    core = SwingCore(ApiService(releases_server, 'user123@gmail.com', 'pass123'))
+    demo_path = os.path.join(get_fixtures_path(), 'demo')
+    with SwingCore.zip_folder(os.path.join(demo_path, 'redis')) as archive:
+        ReleasesHandler.releases[('redis', '1.0.0')] = archive_digest(archive)
+
+    broken_path = tmp_path / 'broken'
+    broken_path.mkdir()
+    (broken_path / 'chart.yaml').write_text('description: no name\n')
+
+    chart_dirs = [os.path.join(demo_path, 'redis'), os.path.join(demo_path, 'psql'), str(broken_path)]
+    with pytest.raises(SwingCoreError) as e:
+        core.publish_releases(chart_dirs, 'Batch release', jobs=3)
+
+    output = capsys.readouterr().out
+
+    assert '1 of 3 charts' in e.value.message
+    assert ReleasesHandler.logins == 1
+    assert len(ReleasesHandler.uploads) == 1
+    assert ('psql', '1.0.0') in ReleasesHandler.releases
+    assert all(status in output for status in [PUBLISHED, SKIPPED, FAILED])
+
+
+def test_get_index_revalidation(index_server, tmp_path):
+    client = ApiService(index_server, 'user123@gmail.com', 'pass123', response_cache=ResponseCache(str(tmp_path), ttl=0))
+
+    first = client.get_index()
+    second = client.get_index()
+
+    assert [c.name for c in first.search('web')] == ['web']
+    assert sorted(second.entries) == ['redis', 'web']
+    assert second.stale is False
+    assert client.stats.successes == 2
+
+
+def test_get_index_stale(tmp_path):
+    server = run_server(IndexHandler)
+    server_url = next(server)
+    cache = ResponseCache(str(tmp_path), ttl=0)
+    ApiService(server_url, 'user123@gmail.com', 'pass123', response_cache=cache).get_index()
+    next(server, None)
+
+    index = ApiService(server_url, 'user123@gmail.com', 'pass123', response_cache=cache, retries=0).get_index()
+
+    assert index.stale is True
+    assert index.resolve_version('redis', '^1.0') == '1.1.0'
+
+
+def test_list_releases_from_index(index_server, capsys):
+    core = SwingCore(ApiService(index_server, 'user123@gmail.com', 'pass123'))
+
+    core.list_releases('web')
+
+    versions = [line.split()[0] for line in capsys.readouterr().out.splitlines()[2:]]
+    assert versions == ['2.0.0', '1.2.0', '1.0.0']
+
+
+def test_install_version_ranges_from_index(index_server, tmp_path):
+    core = SwingCore(ApiService(index_server, 'user123@gmail.com', 'pass123'))
+    install_path = tmp_path / 'charts'
+
+    core.install_requirements([Requirement('web', '^1.0')], str(install_path), jobs=2)
+
+    assert sorted(os.listdir(install_path)) == ['redis-1.0.3.zip', 'web-1.2.0.zip']
+    assert sorted(IndexHandler.requests) == ['/index', '/release/redis-1.0.3.zip', '/release/web-1.2.0.zip']
+
+
+def test_publish_releases_bounded_window(monkeypatch):
+    class CountingCore(SwingCore):
+        def __init__(self):
+            super().__init__(None)
+            self.lock = threading.Lock()
+            self.outstanding = 0
+            self.max_outstanding = 0
+
+        def pack_release(self, chart_dir):
+            with self.lock:
+                self.outstanding += 1
+                self.max_outstanding = max(self.max_outstanding, self.outstanding)
+            return None, None, None
+
+        def upload_archive(self, definition, archive, digest, notes):
+            time.sleep(0.01)
+            with self.lock:
+                self.outstanding -= 1
+            return PUBLISHED
+
+    class LoggedInApi:
+        logged_in = True
+
+    monkeypatch.setattr('os.cpu_count', lambda: 2)
+    core = CountingCore()
+    core.api = LoggedInApi()
+
+    core.publish_releases([f'chart-{i}' for i in range(20)], None, jobs=1)
+
+    assert core.max_outstanding <= 3
@@ -1,13 +1,16 @@
 import unittest
 import os
 import pytest
+import shutil
 import yaml
 
+from swing.builder import ChartBuilder
+from swing.cache import ChartCache
 from swing.core import SwingCore
-from swing.helpers import remove_file, remove_directory, is_readable_file, is_readable_dir
+from swing.helpers import remove_file, remove_directory, is_readable_file, is_readable_dir, file_digest
 from swing.errors import SwingCoreError
-from swing.parsers import parse_requirements
-from helpers import get_fixtures_path
+from swing.parsers import parse_requirements, parse_lock, Requirement
+from helpers import get_fixtures_path, get_test_api, prepare_chart
 
 
 class ChartBuildTestCase(unittest.TestCase):
@@ -65,5 +68,209 @@ class ChartBuildTestCase(unittest.TestCase):
     @classmethod
     def tearDownClass(cls):
         remove_file(cls.output_path)
+        remove_file(ChartBuilder.get_manifest_path(cls.output_path))
         remove_directory(cls.install_path)
 
+
+def test_install_requirements_concurrently(tmp_path):
+    core = SwingCore(api=None)
+    demo_path = os.path.join(get_fixtures_path(), 'demo')
+    requirements = [
+        Requirement('redis', file=os.path.join(demo_path, 'redis')),
+        Requirement('psql', file=os.path.join(demo_path, 'psql')),
+    ]
+
+    core.install_requirements(requirements, str(tmp_path), jobs=2)
+
+    assert sorted(os.listdir(tmp_path)) == ['psql-1.0.0.zip', 'redis-1.0.0.zip']
+
+
+def test_install_requirements_all_or_nothing(tmp_path):
+    core = SwingCore(api=None)
+    requirements = [
+        Requirement('redis', file=os.path.join(get_fixtures_path(), 'demo', 'redis')),
+        Requirement('broken', file=os.path.join(get_fixtures_path(), 'configs')),
+    ]
+
+    with pytest.raises(SwingCoreError) as e:
+        core.install_requirements(requirements, str(tmp_path), jobs=2)
+
+    assert 'broken' in e.value.message
+    assert os.listdir(tmp_path) == []
+
+
+def test_install_requirements_removes_partial_archive(tmp_path, monkeypatch):
+    def copy_partially(source, target):
+        target.write(source.read(10))
+        raise OSError('No space left on device')
+
+    monkeypatch.setattr('swing.core.shutil.copyfileobj', copy_partially)
+    core = SwingCore(api=None)
+
+    with pytest.raises(SwingCoreError) as e:
+        core.install_requirements([Requirement('redis', file=os.path.join(get_fixtures_path(), 'demo', 'redis'))],
+                                  str(tmp_path))
+
+    assert 'No space left' in e.value.message
+    assert os.listdir(tmp_path) == []
+
+
+def test_build_chart_in_parallel(tmp_path):
+    core = prepare_chart(tmp_path)
+
+    core.build_chart(str(tmp_path), str(tmp_path / 'serial.yaml'))
+    core.build_chart(str(tmp_path), str(tmp_path / 'parallel.yaml'), jobs=2)
+
+    with open(tmp_path / 'serial.yaml', 'rb') as serial, open(tmp_path / 'parallel.yaml', 'rb') as parallel:
+        assert serial.read() == parallel.read()
+
+
+def test_build_chart_in_parallel_failure(tmp_path):
+    core = prepare_chart(tmp_path)
+    shutil.copy(os.path.join(get_fixtures_path(), 'charts', 'invalid.zip'), str(tmp_path / 'charts' / 'broken-1.0.0.zip'))
+
+    with pytest.raises(SwingCoreError) as e:
+        core.build_chart(str(tmp_path), str(tmp_path / 'docker-stack.yaml'), jobs=2)
+
+    assert 'broken-1.0.0' in e.value.message
+    assert e.value.message.count('Executing of the command failed') == 1
+
+
+def test_build_chart_incrementally(tmp_path, capsys):
+    core = prepare_chart(tmp_path)
+    output_path = str(tmp_path / 'docker-stack.yaml')
+    core.build_chart(str(tmp_path), output_path)
+
+    with open(tmp_path / 'values.yaml', 'r') as f:
+        values = yaml.safe_load(f)
+    values['redis']['password'] = 'changed'
+    with open(tmp_path / 'values.yaml', 'w') as f:
+        yaml.safe_dump(values, f)
+
+    capsys.readouterr()
+    core.build_chart(str(tmp_path), output_path)
+    output = capsys.readouterr().out
+
+    assert 'Reusing \'psql-1.0.0\' requirement' in output
+    assert 'Building \'redis-1.0.0\' requirement' in output
+
+    with open(output_path, 'r') as f:
+        compose = yaml.safe_load(f)
+    assert compose['services']['redis']['command'] == 'redis-server --requirepass changed'
+    assert compose['services']['postgres']['environment']['POSTGRES_USER'] == 'root'
+
+
+def test_build_chart_bytecode_cache(tmp_path):
+    prepare_chart(tmp_path)
+    output_path = str(tmp_path / 'docker-stack.yaml')
+    bytecode_dir = str(tmp_path / 'templates')
+
+    builder = ChartBuilder(str(tmp_path), force=True, bytecode_dir=bytecode_dir)
+    builder.build_chart(output_path)
+
+    assert builder.cache_hits == 0
+    assert builder.cache_misses == 2
+
+    builder = ChartBuilder(str(tmp_path), force=True, bytecode_dir=bytecode_dir)
+    builder.build_chart(output_path)
+
+    assert builder.cache_hits == 2
+    assert builder.cache_misses == 0
+
+
+def test_install_requirements_frozen(betamax_session, tmp_path):
+    requirements = [Requirement('redis', '1.0.0')]
+    install_path = str(tmp_path / 'charts')
+    lock_path = str(tmp_path / 'requirements.lock')
+
+    core = SwingCore(get_test_api(betamax_session), ChartCache(str(tmp_path / 'cache')))
+    core.install_requirements(requirements, install_path, lock_path=lock_path)
+
+    locked = parse_lock(lock_path)['redis']
+    assert locked.version == '1.0.0'
+    assert locked.digest == file_digest(os.path.join(install_path, 'redis-1.0.0.zip'))
+
+    offline_core = SwingCore(api=None, cache=ChartCache(str(tmp_path / 'cache')))
+    offline_core.install_requirements(requirements, install_path, lock_path=lock_path, frozen=True)
+    remove_file(os.path.join(install_path, 'redis-1.0.0.zip'))
+    offline_core.install_requirements(requirements, install_path, lock_path=lock_path, frozen=True)
+
+    assert is_readable_file(os.path.join(install_path, 'redis-1.0.0.zip'))
+
+    with pytest.raises(SwingCoreError):
+        offline_core.install_requirements([Requirement('redis', '2.0.0')], install_path, lock_path=lock_path,
+                                          frozen=True)
+
+
+def test_build_chart_layered_values(tmp_path):
+    prepare_chart(tmp_path)
+    override_path = tmp_path / 'override.yaml'
+    override_path.write_text('redis:\n  password: override\npsql:\n  username: admin\n')
+
+    builder = ChartBuilder(str(tmp_path), values_files=[str(override_path)],
+                           set_values=[{'redis': {'password': 'from-set'}}])
+    builder.build_chart(str(tmp_path / 'docker-stack.yaml'))
+
+    with open(tmp_path / 'docker-stack.yaml', 'r') as f:
+        compose = yaml.safe_load(f)
+    assert compose['services']['redis']['command'] == 'redis-server --requirepass from-set'
+    assert compose['services']['postgres']['environment']['POSTGRES_USER'] == 'admin'
+    assert compose['services']['postgres']['environment']['POSTGRES_PASSWORD'] == 'secret432'
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_build_chart_environments(tmp_path, jobs):
+    core = prepare_chart(tmp_path)
+    (tmp_path / 'values.dev.yaml').write_text('redis:\n  usePassword: false\n')
+    (tmp_path / 'values.prod.yaml').write_text('redis:\n  password: prod-secret\n')
+
+    core.build_chart(str(tmp_path), str(tmp_path / 'stack.yaml'), jobs=jobs, environments=['dev', 'prod'])
+
+    with open(tmp_path / 'stack.dev.yaml', 'r') as f:
+        dev = yaml.safe_load(f)
+    with open(tmp_path / 'stack.prod.yaml', 'r') as f:
+        prod = yaml.safe_load(f)
+
+    assert dev['services']['redis']['command'] == 'redis-server'
+    assert prod['services']['redis']['command'] == 'redis-server --requirepass prod-secret'
+    assert dev['services']['postgres'] == prod['services']['postgres']
+
+
+def test_read_custom_values_order(tmp_path):
+    (tmp_path / 'values.yaml').write_text('a: chart\nb: chart\nc: chart\nd: chart\n')
+    (tmp_path / 'values.dev.yaml').write_text('b: env\nc: env\nd: env\n')
+    (tmp_path / 'override.yaml').write_text('c: file\nd: file\n')
+
+    builder = ChartBuilder(str(tmp_path), values_files=[str(tmp_path / 'override.yaml')], set_values=[{'d': 'set'}])
+
+    assert builder.read_custom_values('dev') == {'a': 'chart', 'b': 'env', 'c': 'file', 'd': 'set'}
+
+
+def test_build_chart_environments_once(tmp_path):
+    from swing.tracing import tracer
+
+    prepare_chart(tmp_path)
+    (tmp_path / 'values.dev.yaml').write_text('{}\n')
+    (tmp_path / 'values.prod.yaml').write_text('{}\n')
+
+    tracer.enable()
+    try:
+        ChartBuilder(str(tmp_path)).build_environments(['dev', 'prod'], str(tmp_path / 'docker-stack.yaml'))
+        spans = [s.name for s in tracer.spans]
+    finally:
+        tracer.enabled = False
+        tracer.reset()
+
+    assert spans.count('extract') == 2
+    assert spans.count('compile') == 2
+    assert spans.count('render') == 4
+    assert spans.count('write') == 2
+
+
+def test_build_chart_missing_environment(tmp_path):
+    core = prepare_chart(tmp_path)
+
+    with pytest.raises(SwingCoreError) as e:
+        core.build_chart(str(tmp_path), str(tmp_path / 'docker-stack.yaml'), environments=['staging'])
+
+    assert 'staging' in e.value.message
@@ -0,0 +1,99 @@
+import os
+import shutil
+import pytest
+
+from swing.cache import ChartCache, SessionStore
+from swing.helpers import file_digest
+from helpers import get_fixtures_path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ChartCache(str(tmp_path / 'cache'))
+
+
+def get_chart_path():
+    return os.path.join(get_fixtures_path(), 'charts', 'valid.zip')
+
+
+def test_store_and_fetch(cache: ChartCache, tmp_path):
+    digest = cache.store('redis', '1.0.0', get_chart_path())
+    target_path = str(tmp_path / 'redis-1.0.0.zip')
+
+    assert digest == file_digest(get_chart_path())
+    assert cache.get_digest('redis', '1.0.0') == digest
+    assert cache.fetch('redis', '1.0.0', target_path)
+    assert file_digest(target_path) == digest
+
+
+def test_fetch_missing(cache: ChartCache, tmp_path):
+    assert not cache.fetch('redis', '2.0.0', str(tmp_path / 'redis-2.0.0.zip'))
+
+
+def test_prune_least_recently_used(cache: ChartCache):
+    valid_path = get_chart_path()
+    invalid_path = os.path.join(get_fixtures_path(), 'charts', 'invalid.zip')
+
+    cache.store('redis', '1.0.0', valid_path)
+    cache.store('psql', '1.0.0', invalid_path)
+    os.utime(cache.lookup('redis', '1.0.0'), (0, 0))
+
+    removed = cache.prune(os.path.getsize(invalid_path))
+
+    assert removed == 1
+    assert cache.lookup('redis', '1.0.0') is None
+    assert cache.lookup('psql', '1.0.0') is not None
+    assert cache.stats().entries == 1
+    assert cache.get_digest('redis', '1.0.0') is None
+    assert os.listdir(cache.refs_dir) == ['psql']
+
+
+def test_fetch_corrupted_blob(cache: ChartCache, tmp_path):
+    source_path = str(tmp_path / 'source.zip')
+    shutil.copyfile(get_chart_path(), source_path)
+    cache.store('redis', '1.0.0', source_path)
+    with open(cache.lookup('redis', '1.0.0'), 'ab') as f:
+        f.write(b'corrupted')
+
+    assert not cache.fetch('redis', '1.0.0', str(tmp_path / 'redis-1.0.0.zip'))
+    assert cache.lookup('redis', '1.0.0') is None
+    assert not os.path.exists(tmp_path / 'redis-1.0.0.zip')
+
+
+def test_clear_keeps_sessions(cache: ChartCache):
+    store = SessionStore(os.path.join(cache.cache_dir, 'sessions'))
+    cache.store('redis', '1.0.0', get_chart_path())
+    store.save('http://localhost:5000', 'user123@gmail.com', [{'name': 'session', 'value': 'token'}])
+
+    assert cache.clear() == 1
+    assert cache.stats().entries == 0
+    assert cache.get_digest('redis', '1.0.0') is None
+    assert store.load('http://localhost:5000', 'user123@gmail.com') == [{'name': 'session', 'value': 'token'}]
+
+
+def test_prune_includes_templates(cache: ChartCache):
+    template_path = os.path.join(cache.templates_dir, '__jinja2_template.cache')
+    os.makedirs(cache.templates_dir)
+    with open(template_path, 'wb') as f:
+        f.write(b'0' * 1024)
+    os.utime(template_path, (0, 0))
+    cache.store('redis', '1.0.0', get_chart_path())
+
+    stats = cache.stats()
+    assert stats.templates == 1
+    assert stats.size == os.path.getsize(get_chart_path()) + 1024
+
+    assert cache.prune(os.path.getsize(get_chart_path())) == 0
+    assert not os.path.exists(template_path)
+    assert cache.lookup('redis', '1.0.0') is not None
+
+
+def test_clear_removes_templates(cache: ChartCache):
+    os.makedirs(cache.templates_dir)
+    with open(os.path.join(cache.templates_dir, '__jinja2_template.cache'), 'wb') as f:
+        f.write(b'0' * 1024)
+
+    cache.clear()
+
+    assert cache.stats().templates == 0
+    assert not os.path.exists(cache.templates_dir)
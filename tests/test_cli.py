@@ -0,0 +1,70 @@
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+from click.testing import CliRunner
+
+from swing.cli import swing
+from helpers import get_fixtures_path
+
+IMPORT_TIME_BUDGET = 200000
+HEAVY_MODULES = ['requests', 'jinja2', 'yaml', 'tabulate', 'swing.api', 'swing.builder', 'swing.core']
+
+
+def get_project_path():
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_cli(*args):
+    code = 'import sys, swing.cli; print(" ".join(sorted(sys.modules)))'
+    return subprocess.run([sys.executable, *args, '-c', code], cwd=get_project_path(), stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE, universal_newlines=True, check=True)
+
+
+def test_cli_imports_no_heavy_modules():
+    modules = import_cli().stdout.split()
+
+    assert [m for m in HEAVY_MODULES if m in modules] == []
+
+
+def test_cli_import_time():
+    result = import_cli('-X', 'importtime')
+    match = re.search(r'^import time:\s+\d+ \|\s+(\d+) \| swing\.cli$', result.stderr, re.MULTILINE)
+
+    assert match is not None
+    assert int(match.group(1)) < IMPORT_TIME_BUDGET
+
+
+@pytest.mark.parametrize('args', [
+    ['--help'],
+    ['cache', '--help'],
+])
+def test_cli_help(args):
+    config_path = os.path.join(get_fixtures_path(), 'configs', 'valid.cfg')
+    result = CliRunner().invoke(swing, ['--config', config_path, *args])
+
+    assert result.exit_code == 0
+    assert 'Usage:' in result.output
+
+
+@pytest.mark.parametrize('args', [
+    ['build', '--set', 'password'],
+    ['build', '--env', 'dev,,prod'],
+])
+def test_cli_build_invalid_values(args):
+    config_path = os.path.join(get_fixtures_path(), 'configs', 'valid.cfg')
+    result = CliRunner().invoke(swing, ['--config', config_path, *args])
+
+    assert result.exit_code == 2
+    assert 'Invalid' in result.output
+
+
+def test_cli_publish_not_chart(tmp_path):
+    config_path = os.path.join(get_fixtures_path(), 'configs', 'valid.cfg')
+    chart_path = os.path.join(get_fixtures_path(), 'demo', 'redis')
+    result = CliRunner().invoke(swing, ['--config', config_path, 'publish', chart_path, str(tmp_path)])
+
+    assert result.exit_code == 2
+    assert f'No chart definition in \'{tmp_path}\'' in result.output
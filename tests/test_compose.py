@@ -0,0 +1,99 @@
+import pytest
+
+from swing.compose import merge_composes, dump_compose
+from swing.errors import SwingCoreError
+
+
+def test_merge_services():
+    composes = [
+        {'version': '3', 'services': {'redis': {'image': 'redis:5'}}},
+        {'version': '3.8', 'services': {'postgres': {'image': 'postgres:13'}}},
+    ]
+    merged = merge_composes(composes)
+
+    assert merged['version'] == '3.8'
+    assert merged['services']['redis']['image'] == 'redis:5'
+    assert merged['services']['postgres']['image'] == 'postgres:13'
+
+
+def test_merge_service_overrides():
+    base = {
+        'services': {
+            'web': {
+                'image': 'nginx:1.19',
+                'environment': ['DEBUG=1', 'PORT=80'],
+                'ports': ['80:80'],
+                'volumes': ['data:/data', './conf:/etc/nginx'],
+                'deploy': {'replicas': 1, 'resources': {'limits': {'memory': '128M'}}},
+            }
+        },
+        'volumes': {'data': None},
+    }
+    override = {
+        'services': {
+            'web': {
+                'image': 'nginx:1.20',
+                'environment': {'DEBUG': 0},
+                'ports': ['80:80', '443:443'],
+                'volumes': ['./custom:/etc/nginx'],
+                'deploy': {'resources': {'limits': {'cpus': '0.5'}}},
+            }
+        },
+        'volumes': {'data': {'driver': 'local'}},
+    }
+    web = merge_composes([base, override])['services']['web']
+
+    assert web['image'] == 'nginx:1.20'
+    assert web['environment'] == {'DEBUG': '0', 'PORT': '80'}
+    assert web['ports'] == ['80:80', '443:443']
+    assert web['volumes'] == ['data:/data', './custom:/etc/nginx']
+    assert web['deploy'] == {'replicas': 1, 'resources': {'limits': {'memory': '128M', 'cpus': '0.5'}}}
+
+
+def test_merge_depends_on():
+    def merge_depends_on(*values):
+        return merge_composes([{'services': {'web': {'depends_on': v}}} for v in values])['services']['web']
+
+    assert merge_depends_on(['redis'], ['psql', 'redis']) == {'depends_on': ['redis', 'psql']}
+    assert merge_depends_on(['redis'], {'psql': {'condition': 'service_healthy'}}) == {'depends_on': {
+        'redis': {'condition': 'service_started'},
+        'psql': {'condition': 'service_healthy'},
+    }}
+
+
+def test_merge_logging_driver_change():
+    def merge_logging(*values):
+        return merge_composes([{'services': {'web': {'logging': v}}} for v in values])['services']['web']['logging']
+
+    json_file = {'driver': 'json-file', 'options': {'max-size': '10m'}}
+
+    assert merge_logging(json_file, {'options': {'max-file': '3'}}) == {
+        'driver': 'json-file', 'options': {'max-size': '10m', 'max-file': '3'}}
+    assert merge_logging(json_file, {'driver': 'syslog', 'options': {'tag': 'web'}}) == {
+        'driver': 'syslog', 'options': {'tag': 'web'}}
+
+
+def test_variables_are_not_interpolated():
+    merged = merge_composes([{'services': {'web': {'image': 'nginx:${TAG:-latest}', 'command': 'echo $$HOME'}}}])
+
+    assert merged['services']['web'] == {'image': 'nginx:${TAG:-latest}', 'command': 'echo $$HOME'}
+
+
+def test_merge_top_level_sections():
+    merged = merge_composes([
+        {'services': {}, 'networks': {'backend': None}},
+        {'networks': {'backend': {'driver': 'overlay'}, 'frontend': None}},
+    ])
+
+    assert merged['networks'] == {'backend': {'driver': 'overlay'}, 'frontend': {}}
+
+
+def test_dump_is_sorted():
+    compose = dump_compose(merge_composes([{'version': '3', 'services': {'b': {'image': 'b'}, 'a': {'image': 'a'}}}]))
+
+    assert compose.index('a:') < compose.index('b:') < compose.index('version:')
+
+
+def test_merge_invalid_compose():
+    with pytest.raises(SwingCoreError):
+        merge_composes([['not', 'a', 'mapping']])
@@ -1,4 +1,5 @@
 import pytest
+import zipfile
 
 from swing.helpers import *
 from helpers import get_fixtures_path
@@ -32,6 +33,33 @@ def test_merge():
     assert merged_dict['a'] is not None
     assert merged_dict['b']['c'] == 1
     assert merged_dict['b']['e'] == 5
+    assert dict_a['b']['c'] == 3
+
+
+def test_merge_copies_values():
+    base = {'a': {'b': [1]}}
+    override = {'c': {'d': 2}}
+    merged = merge(base, override)
+
+    merged['a']['b'].append(2)
+    merged['c']['d'] = 3
+
+    assert base == {'a': {'b': [1]}}
+    assert override == {'c': {'d': 2}}
+
+
+@pytest.mark.parametrize('expression,expected', [
+    ('redis.password=secret', {'redis': {'password': 'secret'}}),
+    ('replicas=3', {'replicas': 3}),
+    ('debug=true', {'debug': True}),
+    ('name=', {'name': ''}),
+    ('url=http://host:80/a=b', {'url': 'http://host:80/a=b'}),
+    ('text=a: b', {'text': 'a: b'}),
+    ('password', None),
+    ('redis..password=x', None),
+])
+def test_parse_set_value(expression, expected):
+    assert parse_set_value(expression) == expected
 
 
 @pytest.mark.parametrize('filename,expected', [
@@ -41,3 +69,33 @@ def test_merge():
 def test_yaml_filename_selector(filename, expected):
     path = os.path.join(get_fixtures_path(), 'demo', 'redis')
     assert select_yaml(path, filename) == expected
+
+
+@pytest.mark.parametrize('size,expected', [
+    ('1024', 1024),
+    ('500M', 500 * 1024 ** 2),
+    ('2 GB', 2 * 1024 ** 3),
+    ('lots', None),
+])
+def test_parse_size(size, expected):
+    assert parse_size(size) == expected
+
+
+@pytest.mark.parametrize('filename,expected', [
+    ('chart', 'chart.yaml'),
+    ('deployment', 'deployment.yaml'),
+    ('requirements', None),
+])
+def test_zip_yaml_filename_selector(filename, expected):
+    path = os.path.join(get_fixtures_path(), 'charts', 'valid.zip')
+    with zipfile.ZipFile(path, 'r') as zip_archive:
+        assert select_zip_yaml(zip_archive, filename) == expected
+
+
+def test_find_chart_dirs(tmp_path):
+    for chart_dir in ['app/redis', 'app/psql', 'app/psql/charts/nested', '.git/old', 'build/copy']:
+        (tmp_path / chart_dir).mkdir(parents=True)
+        (tmp_path / chart_dir / 'chart.yaml').write_text('name: test\n')
+    (tmp_path / 'app' / 'docs').mkdir()
+
+    assert find_chart_dirs(str(tmp_path)) == [str(tmp_path / 'app' / 'psql'), str(tmp_path / 'app' / 'redis')]
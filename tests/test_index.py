@@ -0,0 +1,44 @@
+from swing.index import RepositoryIndex
+
+INDEX = {
+    'apiVersion': 1,
+    'generated': '2021-02-09T18:02:30Z',
+    'charts': {
+        'redis': {
+            'description': 'Basic redis chart',
+            'releases': [{'version': '1.0.0'}, {'version': '1.10.0'}, {'version': '1.2.0'}],
+        },
+        'redis-cluster': {'description': 'Clustered redis', 'releases': [{'version': '2.0.0'}]},
+        'postgresql': {'description': 'Relational database', 'releases': [{'version': '12.1.0'}]},
+        'rabbitmq': {'description': 'Message broker', 'releases': []},
+    },
+}
+
+
+def test_index_from_dict():
+    index = RepositoryIndex.from_dict(INDEX)
+
+    assert sorted(index.entries) == ['postgresql', 'rabbitmq', 'redis', 'redis-cluster']
+    assert index.generated == '2021-02-09T18:02:30Z'
+    assert RepositoryIndex.from_dict({'apiVersion': 2, 'charts': {}}) is None
+
+
+def test_index_search():
+    index = RepositoryIndex.from_dict(INDEX)
+
+    assert [c.name for c in index.search('redis')] == ['redis', 'redis-cluster']
+    assert [c.name for c in index.search('reddis')] == ['redis']
+    assert [c.name for c in index.search('database')] == ['postgresql']
+    assert [c.name for c in index.search(None)] == ['postgresql', 'rabbitmq', 'redis', 'redis-cluster']
+    assert index.search('nodejs') == []
+
+
+def test_index_releases():
+    index = RepositoryIndex.from_dict(INDEX)
+
+    assert [r.version for r in index.get_releases('redis')] == ['1.10.0', '1.2.0', '1.0.0']
+    assert index.get_releases('nodejs') is None
+    assert index.find_release('redis', '1.2.0').version == '1.2.0'
+    assert index.resolve_version('redis', '^1.1') == '1.10.0'
+    assert index.resolve_version('redis', '~1.2') == '1.2.0'
+    assert index.resolve_version('redis', '^2.0') is None
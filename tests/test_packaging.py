@@ -0,0 +1,88 @@
+import os
+import zipfile
+
+import pytest
+
+from swing.core import SwingCore
+from swing.packaging import list_files, write_archive, COMPRESSION_METHODS
+
+
+def create_chart(chart_path):
+    files = {
+        'chart.yaml': 'name: demo\nversion: 1.0.0\n',
+        'values.yaml': 'replicas: 1\n' * 200,
+        'deployment.yaml': 'services: {}\n',
+        'templates/extra.yaml': 'a: 1\n',
+        'charts/redis-1.0.0.zip': 'junk',
+        'build/output.yaml': 'junk',
+        '.git/HEAD': 'ref: refs/heads/master\n',
+        'docs/notes.md': 'notes',
+        'docs/keep.md': 'keep',
+        'debug.log': 'log',
+    }
+    for name, content in files.items():
+        path = chart_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return chart_path
+
+
+def test_list_files_default_excludes(tmp_path):
+    create_chart(tmp_path)
+
+    assert list_files(str(tmp_path)) == ['chart.yaml', 'debug.log', 'deployment.yaml', 'docs/keep.md',
+                                         'docs/notes.md', 'templates/extra.yaml', 'values.yaml']
+
+
+def test_list_files_ignore_file(tmp_path):
+    create_chart(tmp_path)
+    (tmp_path / '.swingignore').write_text('# local files\n*.log\ndocs/\n!docs/keep.md\n/templates/*.yaml\n')
+
+    assert list_files(str(tmp_path)) == ['chart.yaml', 'deployment.yaml', 'docs/keep.md', 'values.yaml']
+
+
+def test_list_files_ignore_directory(tmp_path):
+    create_chart(tmp_path)
+    (tmp_path / '.swingignore').write_text('docs/\n')
+
+    assert 'docs/keep.md' not in list_files(str(tmp_path))
+
+
+def test_zip_folder_is_deterministic(tmp_path):
+    chart_path = create_chart(tmp_path / 'chart')
+
+    with SwingCore.zip_folder(str(chart_path)) as archive:
+        first = archive.read()
+
+    os.utime(str(chart_path / 'values.yaml'), (1000000000, 1000000000))
+    with SwingCore.zip_folder(str(chart_path)) as archive:
+        second = archive.read()
+
+    assert first == second
+
+
+@pytest.mark.parametrize('compression', sorted(COMPRESSION_METHODS))
+def test_write_archive_compression(tmp_path, compression):
+    chart_path = create_chart(tmp_path / 'chart')
+    archive_path = str(tmp_path / 'chart.zip')
+
+    with open(archive_path, 'wb') as f:
+        write_archive(str(chart_path), f, compression)
+
+    with zipfile.ZipFile(archive_path, 'r') as zip_archive:
+        assert zip_archive.read('values.yaml') == b'replicas: 1\n' * 200
+        assert zip_archive.getinfo('values.yaml').compress_type == COMPRESSION_METHODS[compression]
+        assert zip_archive.getinfo('values.yaml').date_time == (1980, 1, 1, 0, 0, 0)
+
+
+def test_write_archive_compression_level(tmp_path):
+    chart_path = create_chart(tmp_path / 'chart')
+    sizes = {}
+
+    for level in [0, 9]:
+        archive_path = str(tmp_path / f'chart-{level}.zip')
+        with open(archive_path, 'wb') as f:
+            write_archive(str(chart_path), f, 'deflate', level)
+        sizes[level] = os.path.getsize(archive_path)
+
+    assert sizes[9] < sizes[0]
@@ -60,3 +60,47 @@ def test_invalid_definition():
 
     with pytest.raises(InvalidChartDefinitionError):
         parse_chart_definition(path)
+
+
+def test_parse_config_options(tmp_path):
+    path = tmp_path / 'swing.cfg'
+    path.write_text('[swing]\nserver = http://localhost:5000\nemail = user123@gmail.com\npassword = pass123\n'
+                    'read_timeout = 2.5\nretries = 0\npool_size = 16\ncache_size = 500M\n'
+                    'compression = bzip2\ncompression_level = 9\n')
+    config = parse_config(str(path))
+
+    assert config.read_timeout == 2.5
+    assert config.connect_timeout is None
+    assert config.retries == 0
+    assert config.pool_size == 16
+    assert config.cache_size == 500 * 1024 ** 2
+    assert config.compression == 'bzip2'
+    assert config.compression_level == 9
+
+
+@pytest.mark.parametrize('option', [
+    'retries = many',
+    'pool_size = 0',
+    'read_timeout = -1',
+    'cache_size = huge',
+    'compression = rar',
+    'compression_level = 12',
+    'compression = lzma\ncompression_level = 5',
+])
+def test_invalid_config_options(tmp_path, option):
+    path = tmp_path / 'swing.cfg'
+    path.write_text(f'[swing]\nserver = http://localhost:5000\nemail = user123@gmail.com\npassword = pass123\n{option}\n')
+
+    with pytest.raises(InvalidConfigError):
+        parse_config(str(path))
+
+
+def test_parse_requirements_version_range(tmp_path):
+    path = tmp_path / 'requirements.yaml'
+    path.write_text('dependencies:\n  - name: redis\n    version: ^1.2\n')
+
+    assert parse_requirements(str(path))[0].version == '^1.2'
+
+    path.write_text('dependencies:\n  - name: redis\n    version: ^latest\n')
+    with pytest.raises(InvalidRequirementsError):
+        parse_requirements(str(path))
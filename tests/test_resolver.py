@@ -0,0 +1,174 @@
+import os
+import threading
+
+import pytest
+
+from swing.api import ApiService, Release
+from swing.core import SwingCore
+from swing.errors import SwingCoreError
+from swing.parsers import Requirement
+from swing.resolver import DependencyResolver
+
+
+class FakeApi:
+    def __init__(self, releases):
+        self.releases = releases
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def find_release(self, chart_name, version, refresh=True, revalidate=False):
+        with self.lock:
+            self.calls.append((chart_name, version))
+
+        dependencies = self.releases.get((chart_name, version))
+        if dependencies is None:
+            return None
+        return Release(version, None, None, None, dependencies=[{'name': n, 'version': v} for n, v in dependencies])
+
+    def get_index(self, refresh=False, revalidate=False):
+        return None
+
+    def save_release(self, chart_name, version, path):
+        raise SwingCoreError(f'Download of \'{chart_name}\' failed.')
+
+
+def create_chart(root, name, dependencies=None):
+    chart_path = root / name
+    chart_path.mkdir()
+    (chart_path / 'chart.yaml').write_text(f'name: {name}\nversion: 1.0.0\n')
+    (chart_path / 'deployment.yaml').write_text(f'services:\n  {name}:\n    image: {name}\n')
+
+    if dependencies:
+        lines = ['dependencies:']
+        for dependency in dependencies:
+            lines += [f'  - name: {dependency}', f'    file: ../{dependency}']
+        (chart_path / 'requirements.yaml').write_text('\n'.join(lines) + '\n')
+
+    return str(chart_path)
+
+
+def get_names(requirements):
+    return [r.chart_name for r in requirements]
+
+
+def test_resolve_file_dependencies(tmp_path):
+    create_chart(tmp_path, 'base')
+    create_chart(tmp_path, 'cache', ['base'])
+    app = create_chart(tmp_path, 'app', ['base', 'cache'])
+
+    resolved = DependencyResolver(jobs=2).resolve([Requirement('app', file=app)])
+
+    assert get_names(resolved) == ['base', 'cache', 'app']
+
+
+def test_resolve_remote_dependencies_once():
+    api = FakeApi({
+        ('web', '1.0.0'): [('redis', '1.0.0'), ('psql', '2.0.0')],
+        ('worker', '1.0.0'): [('redis', '1.0.0'), ('psql', '2.0.0')],
+        ('redis', '1.0.0'): [],
+        ('psql', '2.0.0'): [('base', '1.0.0')],
+        ('base', '1.0.0'): [],
+    })
+
+    resolved = DependencyResolver(api, jobs=4).resolve([Requirement('web', '1.0.0'), Requirement('worker', '1.0.0')])
+
+    assert get_names(resolved) == ['redis', 'base', 'psql', 'web', 'worker']
+    assert sorted(api.calls) == sorted(set(api.calls))
+
+
+def test_resolve_conflict():
+    api = FakeApi({
+        ('web', '1.0.0'): [('redis', '1.0.0')],
+        ('worker', '1.0.0'): [('redis', '2.0.0')],
+        ('redis', '1.0.0'): [],
+        ('redis', '2.0.0'): [],
+    })
+
+    with pytest.raises(SwingCoreError) as e:
+        DependencyResolver(api).resolve([Requirement('web', '1.0.0'), Requirement('worker', '1.0.0')])
+
+    assert 'web -> redis' in e.value.message
+    assert 'worker -> redis' in e.value.message
+
+
+def test_resolve_same_version_from_file_and_repository(tmp_path):
+    base = create_chart(tmp_path, 'base')
+    api = FakeApi({
+        ('web', '1.0.0'): [('base', '1.0.0')],
+        ('base', '1.0.0'): [],
+    })
+
+    resolved = DependencyResolver(api).resolve([Requirement('base', file=base), Requirement('web', '1.0.0')])
+
+    assert get_names(resolved) == ['base', 'web']
+    assert resolved[0].file == base
+
+
+def test_resolve_different_version_from_file_and_repository(tmp_path):
+    base = create_chart(tmp_path, 'base')
+    api = FakeApi({
+        ('web', '1.0.0'): [('base', '2.0.0')],
+        ('base', '2.0.0'): [],
+    })
+
+    with pytest.raises(SwingCoreError) as e:
+        DependencyResolver(api).resolve([Requirement('base', file=base), Requirement('web', '1.0.0')])
+
+    assert 'web -> base' in e.value.message
+
+
+def test_resolve_cycle(tmp_path):
+    create_chart(tmp_path, 'first', ['second'])
+    second = create_chart(tmp_path, 'second', ['first'])
+
+    with pytest.raises(SwingCoreError) as e:
+        DependencyResolver().resolve([Requirement('second', file=second)])
+
+    assert 'second -> first -> second' in e.value.message
+
+
+def test_resolve_missing_release():
+    with pytest.raises(SwingCoreError):
+        DependencyResolver(FakeApi({})).resolve([Requirement('web', '1.0.0')])
+
+
+def test_install_transitive_requirements(tmp_path):
+    charts_path = tmp_path / 'src'
+    charts_path.mkdir()
+    create_chart(charts_path, 'base')
+    create_chart(charts_path, 'cache', ['base'])
+    app = create_chart(charts_path, 'app', ['base', 'cache'])
+    install_path = tmp_path / 'charts'
+
+    SwingCore(api=None).install_requirements([Requirement('app', file=app)], str(install_path), jobs=2)
+
+    assert sorted(os.listdir(install_path)) == ['app-1.0.0.zip', 'base-1.0.0.zip', 'cache-1.0.0.zip']
+
+
+def test_install_file_requirements_offline(tmp_path):
+    charts_path = tmp_path / 'src'
+    charts_path.mkdir()
+    create_chart(charts_path, 'base')
+    app = create_chart(charts_path, 'app', ['base'])
+    install_path = tmp_path / 'charts'
+    api = ApiService('http://127.0.0.1:1', 'user123@gmail.com', 'pass123', retries=0)
+
+    SwingCore(api).install_requirements([Requirement('app', file=app)], str(install_path))
+
+    assert sorted(os.listdir(install_path)) == ['app-1.0.0.zip', 'base-1.0.0.zip']
+    assert api.stats.requests == 0
+
+
+def test_failed_install_keeps_previous_archives(tmp_path):
+    charts_path = tmp_path / 'src'
+    charts_path.mkdir()
+    base = create_chart(charts_path, 'base')
+    install_path = tmp_path / 'charts'
+    core = SwingCore(FakeApi({('web', '1.0.0'): []}))
+    core.install_requirements([Requirement('base', file=base)], str(install_path))
+
+    with pytest.raises(SwingCoreError) as e:
+        core.install_requirements([Requirement('base', file=base), Requirement('web', '1.0.0')], str(install_path))
+
+    assert 'web' in e.value.message
+    assert os.listdir(install_path) == ['base-1.0.0.zip']
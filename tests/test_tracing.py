@@ -0,0 +1,88 @@
+import json
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from swing.builder import ChartBuilder
+from swing.cli import swing
+from swing.tracing import tracer, Tracer
+from helpers import prepare_chart
+
+
+@pytest.fixture
+def traced():
+    tracer.enable()
+    tracer.reset()
+    yield tracer
+    tracer.enabled = False
+    tracer.reset()
+
+
+def get_span_names(spans):
+    return {s.name for s in spans}
+
+
+def test_disabled_tracer_records_nothing():
+    disabled = Tracer()
+    with disabled.span('render'):
+        pass
+
+    assert disabled.spans == []
+
+
+def test_build_chart_spans(tmp_path, traced):
+    prepare_chart(tmp_path)
+    traced.reset()
+
+    ChartBuilder(str(tmp_path), force=True).build_chart(str(tmp_path / 'docker-stack.yaml'))
+
+    assert get_span_names(traced.spans) >= {'requirement', 'extract', 'parse definition', 'read values', 'render',
+                                            'parse compose', 'merge', 'write'}
+    assert sorted(r.name for r in traced.summarize_requirements()) == ['psql-1.0.0', 'redis-1.0.0']
+
+
+def test_build_chart_in_parallel_spans(tmp_path, traced):
+    prepare_chart(tmp_path)
+    traced.reset()
+
+    ChartBuilder(str(tmp_path), jobs=2, force=True).build_chart(str(tmp_path / 'docker-stack.yaml'))
+
+    assert len([s for s in traced.spans if s.name == 'render']) == 2
+    assert sorted(s.args['requirement'] for s in traced.spans if s.name == 'requirement') == \
+        ['psql-1.0.0', 'redis-1.0.0']
+
+
+def test_install_requirements_spans(tmp_path, traced):
+    prepare_chart(tmp_path)
+
+    assert sorted(s.args['requirement'] for s in traced.spans if s.name == 'requirement') == ['psql', 'redis']
+    assert len([s for s in traced.spans if s.name == 'pack']) == 2
+
+
+def test_cli_timings_and_trace(tmp_path):
+    prepare_chart(tmp_path)
+    config_path = tmp_path / 'swing.cfg'
+    config_path.write_text('[swing]\nserver = http://localhost:5000\nemail = user123@gmail.com\n'
+                           f'password = pass123\ncache_dir = {tmp_path / "cache"}\n')
+    trace_path = str(tmp_path / 'trace.json')
+
+    try:
+        result = CliRunner().invoke(swing, ['--config', str(config_path), '--timings', '--trace', trace_path,
+                                            'build', str(tmp_path)])
+    finally:
+        tracer.enabled = False
+        tracer.reset()
+
+    assert result.exit_code == 0
+    assert 'Phase' in result.output
+    assert 'render' in result.output
+
+    with open(trace_path, 'r') as f:
+        trace = json.load(f)
+
+    events = trace['traceEvents']
+    assert {'ph', 'ts', 'dur', 'pid', 'tid', 'name'} <= set(events[0])
+    assert {e['name'] for e in events} >= {'render', 'merge', 'write'}
+    assert trace['otherData']['command'] == 'build'
+    assert not os.path.exists(f'{trace_path}.part')
@@ -0,0 +1,68 @@
+import pytest
+
+from swing.versions import parse_version, get_version_key, is_version_range, matches_version, select_version
+
+
+@pytest.mark.parametrize('version,expected', [
+    ('1.2.3', (1, 2, 3)),
+    ('2.1', (2, 1, 0)),
+    (3, (3, 0, 0)),
+    ('v1.0.0-rc1', (1, 0, 0)),
+    ('latest', None),
+])
+def test_parse_version(version, expected):
+    assert parse_version(version) == expected
+
+
+@pytest.mark.parametrize('spec,expected', [
+    ('^1.2', True),
+    ('~1.0', True),
+    ('~ 1.0.1', True),
+    ('^1.3.0-rc.1', True),
+    ('1.0.0', False),
+    ('^latest', False),
+])
+def test_is_version_range(spec, expected):
+    assert is_version_range(spec) == expected
+
+
+@pytest.mark.parametrize('version,spec,expected', [
+    ('1.9.0', '^1.2', True),
+    ('1.1.0', '^1.2', False),
+    ('2.0.0', '^1.2', False),
+    ('0.2.5', '^0.2', True),
+    ('0.3.0', '^0.2', False),
+    ('1.0.7', '~1.0', True),
+    ('1.1.0', '~1.0', False),
+    ('1.4.0', '~1', True),
+    ('3.0', '3.0', True),
+    ('3.0.1', '3.0', False),
+    ('1.4.0-beta', '^1.2', False),
+    ('1.3.0-rc.1', '1.3.0', False),
+    ('1.3.0-rc.2', '^1.3.0-rc.1', True),
+    ('1.3.1-rc.1', '^1.3.0-rc.1', False),
+    ('1.3.0', '~1.3.0-rc.1', True),
+])
+def test_matches_version(version, spec, expected):
+    assert matches_version(version, spec) == expected
+
+
+def test_select_version():
+    versions = ['1.0.0', '1.2.0', '1.10.0', '2.0.0']
+
+    assert select_version(versions, '^1.0') == '1.10.0'
+    assert select_version(versions, '~1.2') == '1.2.0'
+    assert select_version(versions, '^3.0') is None
+
+
+def test_version_key_ranks_prereleases():
+    versions = ['1.3.0', '1.3.0-rc.1', '1.3.0-alpha', '1.3.0-rc.10', '1.3.0-rc.2', '1.2.9']
+
+    assert sorted(versions, key=get_version_key) == ['1.2.9', '1.3.0-alpha', '1.3.0-rc.1', '1.3.0-rc.2',
+                                                     '1.3.0-rc.10', '1.3.0']
+
+
+def test_select_version_prereleases():
+    assert select_version(['1.3.0-rc.1', '1.2.0', '1.3.0'], '^1.2') == '1.3.0'
+    assert select_version(['1.2.0', '1.3.0', '1.4.0-beta'], '^1.2') == '1.3.0'
+    assert select_version(['1.3.0-rc.1', '1.3.0-rc.2'], '^1.3.0-rc.1') == '1.3.0-rc.2'
@@ -0,0 +1,41 @@
+import os
+
+import yaml
+
+from swing.yaml_utils import load_yaml, dump_yaml, load_yaml_file, clear_file_cache
+
+
+def test_load_yaml_matches_pure_loader():
+    text = 'a: 1\nb:\n  - x\n  - y: 2.5\nc: null\nd: "05"\n'
+    assert load_yaml(text) == load_yaml(text, loader=yaml.SafeLoader)
+
+
+def test_dump_yaml_round_trip():
+    data = {'services': {'web': {'ports': ['80:80'], 'environment': {'A': '1'}}}, 'version': '3.7'}
+    text = dump_yaml(data, default_flow_style=False, sort_keys=True)
+    assert text == dump_yaml(data, dumper=yaml.SafeDumper, default_flow_style=False, sort_keys=True)
+    assert load_yaml(text) == data
+
+
+def test_load_yaml_file_returns_copies(tmp_path):
+    clear_file_cache()
+    path = tmp_path / 'values.yaml'
+    path.write_text('a:\n  b: 1\n')
+
+    first = load_yaml_file(str(path))
+    first['a']['b'] = 2
+
+    assert load_yaml_file(str(path)) == {'a': {'b': 1}}
+
+
+def test_load_yaml_file_reloads_changed_file(tmp_path):
+    clear_file_cache()
+    path = tmp_path / 'values.yaml'
+    path.write_text('a: 1\n')
+    assert load_yaml_file(str(path)) == {'a': 1}
+
+    path.write_text('a: 22\n')
+    stat = os.stat(str(path))
+    os.utime(str(path), ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+
+    assert load_yaml_file(str(path)) == {'a': 22}